@@ -0,0 +1,233 @@
+#!/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import os
+import pytest
+import sys
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)) + '/..')  # noqa
+
+# Drawing is a GObject, skip everything if we don't have the bindings
+pytest.importorskip('gi')
+
+from tuhi.drawing import Drawing  # noqa
+
+logger = logging.getLogger('tuhi')  # piggyback the debug messages
+logger.setLevel(logging.DEBUG)
+
+
+def new_drawing():
+    d = Drawing('Intuos Pro', (44800, 29600), 1565750050)
+    s = d.new_stroke()
+    s.new_abs((100, 200), 1000)
+    s.new_rel((1, -2), 5)
+    s.new_rel(None, -5)
+    s.new_abs((150, 250), None)
+    d.new_stroke()  # empty, dropped by seal()
+    s = d.new_stroke()
+    s.extend_abs([(10, 20), (11, 21), (12, 22)], [300, 400, 500])
+    return d
+
+
+class TestDrawing(object):
+    def test_to_json(self):
+        d = new_drawing()
+        d.seal()
+
+        js = json.loads(d.to_json())
+        assert js == {
+            'version': Drawing.JSON_FILE_FORMAT_VERSION,
+            'devicename': 'Intuos Pro',
+            'sessionid': 'unset',
+            'dimensions': [44800, 29600],
+            'timestamp': 1565750050,
+            'strokes': [
+                {'points': [
+                    {'position': [100, 200], 'pressure': 1000},
+                    {'position': [101, 198], 'pressure': 1005},
+                    {'pressure': 1000},
+                    {'position': [150, 250]},
+                ]},
+                {'points': [
+                    {'position': [10, 20], 'pressure': 300},
+                    {'position': [11, 21], 'pressure': 400},
+                    {'position': [12, 22], 'pressure': 500},
+                ]},
+            ],
+        }
+
+    def test_json_roundtrip(self, tmp_path):
+        d = new_drawing()
+        d.seal()
+
+        path = tmp_path / f'{d.timestamp}.json'
+        with open(path, 'w') as f:
+            f.write(d.to_json(indent=2))
+
+        d2 = Drawing.from_json(path)
+        assert d2 is not None
+        assert d2.name == d.name
+        assert d2.dimensions == d.dimensions
+        assert d2.timestamp == d.timestamp
+        assert [len(s) for s in d2.strokes] == [len(s) for s in d.strokes]
+        assert json.loads(d2.to_json()) == json.loads(d.to_json())
+
+    def test_json_invalid_version(self, tmp_path):
+        d = new_drawing()
+        d.seal()
+        js = json.loads(d.to_json())
+        js['version'] = Drawing.JSON_FILE_FORMAT_VERSION + 1
+
+        path = tmp_path / 'invalid.json'
+        with open(path, 'w') as f:
+            json.dump(js, f)
+
+        assert Drawing.from_json(path) is None
+
+    def test_json_indent(self):
+        d = new_drawing()
+        d.seal()
+
+        compact = d.to_json()
+        indented = d.to_json(indent=2)
+        assert '\n' not in compact
+        assert indented.startswith('{\n  "version": ')
+        assert json.loads(indented) == json.loads(compact)
+
+    def test_json_cache(self):
+        d = new_drawing()
+
+        # not sealed yet, the JSON must follow the changes
+        js = d.to_json()
+        d.current_stroke.new_abs((13, 23), 600)
+        js2 = d.to_json()
+        assert js2 != js
+        assert len(json.loads(js2)['strokes'][-1]['points']) == 4
+
+        # sealed, the compact JSON is only generated once
+        d.seal()
+        js = d.to_json()
+        assert d.to_json() is js
+
+        # an indented one is not cached and doesn't replace the cached one
+        indented = d.to_json(indent=2)
+        assert d.to_json(indent=2) is not indented
+        assert d.to_json() is js
+
+    def test_extend_abs(self):
+        positions = [(1, 2), (3, 4), (5, 6)]
+        pressures = [10, 20, 30]
+
+        d = Drawing('test', (100, 100), 0)
+        s1 = d.new_stroke()
+        for position, pressure in zip(positions, pressures):
+            s1.new_abs(position, pressure)
+        s1.new_rel((1, 1), 1)
+
+        s2 = d.new_stroke()
+        s2.extend_abs(positions, pressures)
+        # relative samples continue from the last absolute one
+        s2.new_rel((1, 1), 1)
+
+        assert len(s2) == 4
+        assert s2.to_dict() == s1.to_dict()
+        assert [(p.position, p.pressure) for p in s2.points] == \
+            [(p.position, p.pressure) for p in s1.points]
+
+    def test_extend_abs_empty(self):
+        d = Drawing('test', (100, 100), 0)
+        s = d.new_stroke()
+        s.new_abs((1, 2), 3)
+        s.extend_abs([], [])
+        s.new_rel((1, 1), 1)
+        assert s.to_dict() == {'points': [
+            {'position': (1, 2), 'pressure': 3},
+            {'position': (2, 3), 'pressure': 4},
+        ]}
+
+    def test_extend_abs_sealed(self):
+        d = Drawing('test', (100, 100), 0)
+        s = d.new_stroke()
+        s.seal()
+        with pytest.raises(AssertionError):
+            s.extend_abs([(1, 2)], [3])
+
+
+class TestJSONDataFd(object):
+    '''
+    GetJSONDataFd hands the JSON over in a memfd, check that what the
+    client reads back is what the daemon wrote.
+    '''
+    @pytest.fixture(autouse=True)
+    def dbus_modules(self):
+        pytest.importorskip('gi.repository.Gio')
+        import tuhi.dbusserver
+        import tuhi.dbusclient
+        self.server = tuhi.dbusserver
+        self.client = tuhi.dbusclient
+
+    class Invocation(object):
+        def return_value_with_unix_fd_list(self, result, fd_list):
+            self.result = result
+            self.fd_list = fd_list
+
+    def get_json_data_fd(self, drawings, args):
+        # only the drawings are needed to answer the call, not a full
+        # device on the bus
+        class Device(object):
+            _json_data = self.server.TuhiDBusDevice._json_data
+            _json_data_fd = self.server.TuhiDBusDevice._json_data_fd
+
+        device = Device()
+        device.drawings = {d.timestamp: d for d in drawings}
+
+        invocation = self.Invocation()
+        device._json_data_fd(args, invocation)
+        read_json_fd = self.client.TuhiDBusClientDevice._read_json_fd
+        return read_json_fd(invocation.result, invocation.fd_list)
+
+    def test_json_data_fd(self):
+        d = new_drawing()
+        d.seal()
+
+        js = self.get_json_data_fd([d], (Drawing.JSON_FILE_FORMAT_VERSION, d.timestamp))
+        assert js == d.to_json()
+
+    def test_json_data_fd_large(self):
+        d = Drawing('test', (100, 100), 0)
+        s = d.new_stroke()
+        s.extend_abs([(x, x) for x in range(100000)], list(range(100000)))
+        d.seal()
+
+        js = self.get_json_data_fd([d], (Drawing.JSON_FILE_FORMAT_VERSION, d.timestamp))
+        assert js == d.to_json()
+
+    def test_json_data_fd_unknown_timestamp(self):
+        d = new_drawing()
+        d.seal()
+
+        js = self.get_json_data_fd([d], (Drawing.JSON_FILE_FORMAT_VERSION, d.timestamp + 1))
+        assert js == ''
+
+    def test_json_data_fd_unsupported_format(self):
+        d = new_drawing()
+        d.seal()
+
+        js = self.get_json_data_fd([d], (Drawing.JSON_FILE_FORMAT_VERSION + 1, d.timestamp))
+        assert js == ''
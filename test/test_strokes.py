@@ -323,6 +323,23 @@ class TestStrokeParsers(object):
 
 
 class TestStrokes(object):
+    def check_file(self, files, bytesize, timestamp, strokes):
+        # strokes is a list of (npoints, first point, last point, sums) with
+        # sums being the (x, y, p) sums over all points in that stroke
+        assert len(files) == 1
+        f = files[0]
+        assert f.bytesize == bytesize
+        assert f.timestamp == timestamp
+        assert len(f.strokes) == len(strokes)
+        for stroke, (npoints, first, last, sums) in zip(f.strokes, strokes):
+            points = stroke.points
+            assert len(points) == npoints
+            assert points[0] == first
+            assert points[-1] == last
+            assert sum(p.x for p in points) == sums[0]
+            assert sum(p.y for p in points) == sums[1]
+            assert sum(p.p for p in points) == sums[2]
+
     def test_single_stroke(self):
         data = '''
             67 82 69 65 22 73 53 5d    00 00 02 00 00 00 00 00    ff fa c3 1f
@@ -356,7 +373,11 @@ class TestStrokes(object):
         b = [int(x, 16) for x in b]
 
         p = Protocol(ProtocolVersion.INTUOS_PRO, None, None)
-        p.parse_pen_data(b)
+        files = p.parse_pen_data(b)
+        self.check_file(files, 505, 1565750050, [
+            (36, (15425, 12307, 882), (15398, 12472, 404), (555540, 443875, 109892)),
+            (90, (28627, 14426, 960), (27781, 20549, 1674), (2537569, 1578234, 234576)),
+        ])
 
     def test_double_stroke(self):
         data = '''
@@ -383,7 +404,11 @@ class TestStrokes(object):
         b = [int(x, 16) for x in b]
 
         p = Protocol(ProtocolVersion.INTUOS_PRO, None, None)
-        p.parse_pen_data(b)
+        files = p.parse_pen_data(b)
+        self.check_file(files, 345, 1565771560, [
+            (40, (10742, 7642, 1188), (10774, 9191, 827), (430480, 342839, 113158)),
+            (35, (12098, 7419, 2661), (12137, 9124, 1180), (424456, 291040, 138134)),
+        ])
 
     def test_quint_stroke(self):
         data = '''
@@ -442,4 +467,11 @@ class TestStrokes(object):
         b = [int(x, 16) for x in b]
 
         p = Protocol(ProtocolVersion.INTUOS_PRO, None, None)
-        p.parse_pen_data(b)
+        files = p.parse_pen_data(b)
+        self.check_file(files, 981, 1565773516, [
+            (54, (10645, 7849, 1571), (10481, 9424, 1654), (570427, 464594, 184462)),
+            (30, (14012, 7744, 2048), (13771, 9621, 517), (415027, 265738, 98337)),
+            (30, (16394, 7705, 1371), (16205, 9187, 536), (488677, 253647, 92378)),
+            (26, (18140, 7554, 1604), (18062, 8872, 1280), (470424, 214840, 68299)),
+            (90, (7435, 9134, 996), (22106, 6737, 651), (1300586, 710244, 256859)),
+        ])
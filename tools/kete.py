@@ -17,9 +17,10 @@ import argparse
 import binascii
 import cmd
 import errno
+import functools
 import os
-import json
 import logging
+import re
 import readline
 import struct
 import threading
@@ -29,14 +30,12 @@ import configparser
 from pathlib import Path
 
 try:
-    from tuhi.export import JsonSvg, JsonPng
     import tuhi.dbusclient
 except ModuleNotFoundError:
     # If PYTHONPATH isn't set up or we never installed Tuhi, the module
     # isn't available. And since we don't install kete, we can assume that
     # we're still in the git repo, so messing with the path is "fine".
     sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)) + '/..')  # noqa
-    from tuhi.export import JsonSvg, JsonPng
     import tuhi.dbusclient
 
 
@@ -62,6 +61,16 @@ Orientation = Reverse-Portrait
 HandlePressure = true
 '''
 
+# indexed by the device's BatteryState
+CHARGE_STRS = ('unknown', 'charging', 'discharging')
+
+
+@functools.lru_cache(maxsize=1024)
+def _fmt_ts(ts):
+    # our formats are fixed and locale-independent, no need for strftime()
+    t = time.localtime(ts)
+    return f'{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d} at {t.tm_hour:02d}:{t.tm_min:02d}'
+
 
 class ColorFormatter(logging.Formatter):
     BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, LIGHT_GRAY = range(30, 38)
@@ -79,17 +88,24 @@ class ColorFormatter(logging.Formatter):
 
     def __init__(self, *args, **kwargs):
         logging.Formatter.__init__(self, *args, **kwargs)
+        # $COLOR depends on the record and is substituted in format()
+        self._tokens = {
+            'RESET': self.RESET_SEQ,
+            'BOLD': self.BOLD_SEQ,
+        }
+        for k, v in self.COLORS.items():
+            self._tokens[k] = self.COLOR_SEQ % (v + 30)
+        self._token_re = re.compile(r'\$(COLOR|' + '|'.join(self._tokens) + ')')
 
     def format(self, record):
-        levelname = record.levelname
-        color = self.COLOR_SEQ % (self.COLORS[levelname])
+        color = self.COLOR_SEQ % (self.COLORS[record.levelname])
         message = logging.Formatter.format(self, record)
-        message = message.replace('$RESET', self.RESET_SEQ)\
-                         .replace('$BOLD', self.BOLD_SEQ)\
-                         .replace('$COLOR', color)
-        for k, v in self.COLORS.items():
-            message = message.replace('$' + k, self.COLOR_SEQ % (v + 30))
-        return message + self.RESET_SEQ
+
+        def replace(match):
+            token = match.group(1)
+            return color if token == 'COLOR' else self._tokens[token]
+
+        return self._token_re.sub(replace, message) + self.RESET_SEQ
 
 
 log_format = '$COLOR%(levelname)s: %(message)s'
@@ -99,11 +115,13 @@ logger = logging.getLogger('tuhi-kete')
 logger.addHandler(logger_handler)
 logger.setLevel(logging.INFO)
 
-# remove ':' from the completer delimiters of readline so we can match on
-# device addresses
-completer_delims = readline.get_completer_delims()
-completer_delims = completer_delims.replace(':', '')
-readline.set_completer_delims(completer_delims)
+
+def looks_like_address(string):
+    try:
+        tuhi.dbusclient.TuhiDBusClientDevice.is_device_address(string)
+        return True
+    except argparse.ArgumentTypeError:
+        return False
 
 
 def b2hex(bs):
@@ -116,11 +134,17 @@ class TuhiKeteManager(tuhi.dbusclient.TuhiDBusClientManager):
     def __init__(self):
         super().__init__()
         self.connect('unregistered_device', self._on_unregistered_device)
+        # the registered devices show up asynchronously
+        self.connect('notify::devices', self._on_devices_changed)
 
         self.sigs = {}
+        self._on_devices_changed(self, None)
+
+    def _on_devices_changed(self, manager, pspec):
         for d in self.devices:
-            self.sigs[d] = []
-            self._connect_device(d)
+            if d not in self.sigs:
+                self.sigs[d] = []
+                self._connect_device(d)
 
     def _disconnect_device_signals(self, device):
         try:
@@ -132,6 +156,8 @@ class TuhiKeteManager(tuhi.dbusclient.TuhiDBusClientManager):
 
     def _on_unregistered_device(self, manager, device):
         self._disconnect_device_signals(device)
+        # once registered, 'registered' connects the device for us
+        self.sigs.setdefault(device, [])
 
         def log_press_required(device):
             logger.info(f'{device}: Press button on device now')
@@ -233,12 +259,8 @@ class Listener(Worker):
     def __init__(self, manager, args):
         super(Listener, self).__init__(manager)
 
-        self.device = None
-        for d in manager.devices:
-            if d.address == args.address:
-                self.device = d
-                break
-        else:
+        self.device = manager.get(args.address)
+        if self.device is None:
             logger.error(f'{args.address}: device not found')
             # FIXME: this should be an exception
             return
@@ -280,7 +302,7 @@ class Listener(Worker):
         self._log_drawings_available(device)
 
     def _log_drawings_available(self, device):
-        s = ', '.join([f'{t}' for t in device.drawings_available])
+        s = ', '.join(map(str, device.drawings_available))
         logger.info(f'{device}: drawings available: {s}')
 
 
@@ -298,23 +320,17 @@ class Fetcher(Worker):
 
         self.orientation = config[address].get('Orientation', 'Landscape')
 
-        for d in manager.devices:
-            if d.address == address:
-                self.device = d
-                break
-        else:
+        self.device = manager.get(address)
+        if self.device is None:
             logger.error(f'{address}: device not found')
             return
 
         if index != 'all':
-            try:
-                index = int(index)
-                if index not in self.device.drawings_available:
-                    raise ValueError()
-                self.timestamps = [index]
-            except ValueError:
+            # do_fetch's parser already turned the index into an int
+            if index not in self.device.drawings_available:
                 logger.error(f'Invalid index {index}')
                 return
+            self.timestamps = (index,)
         else:
             self.timestamps = self.device.drawings_available
 
@@ -322,30 +338,46 @@ class Fetcher(Worker):
         if self.device is None or self.timestamps is None:
             return
 
+        # Request all drawings at once, each one is saved as soon as its
+        # data arrives
         for ts in self.timestamps:
-            jsondata = self.device.json(ts)
+            self.device.json_async(ts, self._on_json_data)
+
+    def _on_json_data(self, device, timestamp, jsondata, error):
+        if error is not None:
+            logger.error(f'{device}: failed to fetch drawing {timestamp}: {error.message}')
+            return
+        if not jsondata:
+            logger.error(f'{device}: failed to fetch drawing {timestamp}: no data')
+            return
+
+        # tuhi.export pulls in cairo, only import it when we need it.
+        # Same for json, no other command needs it
+        import json
+        from tuhi.export import JsonSvg, JsonPng
+
+        try:
             data = json.loads(jsondata)
-            t = time.localtime(data['timestamp'])
-            t = time.strftime('%Y-%m-%d-%H-%M', t)
-            if self.format == 'png':
-                path = f'{data["devicename"]}-{t}.png'
-                JsonPng(data, self.orientation, filename=path)
-            else:
-                path = f'{data["devicename"]}-{t}.svg'
-                JsonSvg(data, self.orientation, filename=path)
-            logger.info(f'{data["devicename"]}: saved file "{path}"')
+        except ValueError as e:
+            logger.error(f'{device}: failed to fetch drawing {timestamp}: {e}')
+            return
+        t = time.localtime(data['timestamp'])
+        t = f'{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}-{t.tm_hour:02d}-{t.tm_min:02d}'
+        if self.format == 'png':
+            path = f'{data["devicename"]}-{t}.png'
+            JsonPng(data, self.orientation, filename=path)
+        else:
+            path = f'{data["devicename"]}-{t}.svg'
+            JsonSvg(data, self.orientation, filename=path)
+        logger.info(f'{data["devicename"]}: saved file "{path}"')
 
 
 class LiveChanger(Worker):
     def __init__(self, manager, args):
         super(LiveChanger, self).__init__(manager)
 
-        self.device = None
-        for d in manager.devices:
-            if d.address == args.address:
-                self.device = d
-                break
-        else:
+        self.device = manager.get(args.address)
+        if self.device is None:
             logger.error(f'{args.address}: device not found')
             # FIXME: this should be an exception
             return
@@ -393,28 +425,50 @@ class LiveChanger(Worker):
 
 
 class TuhiKeteShellLogHandler(logging.StreamHandler):
+    # A burst of records (e.g. while listening) would read the same
+    # readline buffer for every one of them. Records logged within this
+    # many seconds of a read reuse its result, nobody types that fast.
+    LINE_BUFFER_MAX_AGE = 0.005
+
     def __init__(self):
         super(TuhiKeteShellLogHandler, self).__init__(sys.stdout)
-        self.setFormatter(ColorFormatter(log_format))
-        self._prompt = ''
+        # the mode switches around every command, so build both
+        # formatters once
+        self._normal_formatter = ColorFormatter(log_format)
+        # '\x1b[2K\r' clears the current line and start again from the beginning
+        self._prompt_formatter = ColorFormatter(f'\x1b[2K\r{log_format}')
+        self.setFormatter(self._normal_formatter)
+        # (formatter, prompt), replaced as a whole so emit() in the GLib
+        # thread always sees a consistent pair without taking a lock
+        self._mode = (self._normal_formatter, '')
+        # (time, buffer) of the last readline.get_line_buffer() call
+        self._line_buffer = None
 
     def emit(self, record):
-        self.terminator = f'\n{self._prompt}{readline.get_line_buffer()}'
-        super(TuhiKeteShellLogHandler, self).emit(record)
-
+        formatter, prompt = self._mode
+        now = time.monotonic()
+        line_buffer = self._line_buffer
+        if line_buffer is None or now - line_buffer[0] > self.LINE_BUFFER_MAX_AGE:
+            line_buffer = (now, readline.get_line_buffer())
+            self._line_buffer = line_buffer
+        try:
+            self.stream.write(f'{formatter.format(record)}\n{prompt}{line_buffer[1]}')
+            self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    # The mode switches happen in the cmdloop thread for every command.
+    # Each is a single attribute store, so they don't take the handler
+    # lock.
     def set_normal_mode(self):
-        self.acquire()
-        self.setFormatter(ColorFormatter(log_format))
-        self.terminator = '\n'
-        self._prompt = ''
-        self.release()
+        self._mode = (self._normal_formatter, '')
+        self._line_buffer = None
 
     def set_prompt_mode(self, prompt):
-        self.acquire()
-        # '\x1b[2K\r' clears the current line and start again from the beginning
-        self.setFormatter(ColorFormatter(f'\x1b[2K\r{log_format}'))
-        self._prompt = prompt
-        self.release()
+        self._mode = (self._prompt_formatter, prompt)
+        self._line_buffer = None
 
 
 class TuhiKeteShell(cmd.Cmd):
@@ -424,7 +478,13 @@ class TuhiKeteShell(cmd.Cmd):
     def __init__(self, completekey='tab', stdin=None, stdout=None):
         super(TuhiKeteShell, self).__init__(completekey, stdin, stdout)
         self._manager = None
+        # set once the manager has added the registered devices, see
+        # precmd()
+        self._devices_ready = threading.Event()
         self._workers = []
+        # address: Listener, so we don't have to search self._workers
+        self._listener_by_addr = {}
+        self._parsers = {}
         self._log_handler = TuhiKeteShellLogHandler()
         logger.removeHandler(logger_handler)
         logger.addHandler(self._log_handler)
@@ -433,6 +493,10 @@ class TuhiKeteShell(cmd.Cmd):
         # patching get_names to hide some functions we do not want in the help
         self.get_names = self._filtered_get_names
 
+        # command name: do_* method, see onecmd()
+        self._cmd_funcs = {name[3:]: getattr(self, name)
+                           for name in dir(self) if name.startswith('do_')}
+
         CONFIG_PATH.mkdir(exist_ok=True)
 
         self._config_file = Path(CONFIG_PATH, 'settings.ini')
@@ -452,6 +516,9 @@ class TuhiKeteShell(cmd.Cmd):
             readline.write_history_file(self._history_file)
 
         readline.set_history_length(100)
+        # all our arguments are whitespace-separated, only split on
+        # whitespace so the completers always see a full device address
+        readline.set_completer_delims(' \t\n')
 
         Gio.bus_watch_name(Gio.BusType.SESSION,
                            tuhi.dbusclient.TUHI_DBUS_NAME,
@@ -482,7 +549,15 @@ class TuhiKeteShell(cmd.Cmd):
 
     def _on_name_appeared(self, connection, name, client):
         logger.info('Connected to the Tuhi daemon')
-        self._manager = TuhiKeteManager()
+        self._devices_ready.clear()
+        manager = TuhiKeteManager()
+        manager.connect('notify::initialized', self._on_manager_initialized)
+        self._manager = manager
+        if manager.initialized:
+            self._devices_ready.set()
+
+    def _on_manager_initialized(self, manager, pspec):
+        self._devices_ready.set()
 
     def _on_name_vanished(self, connection, name):
         if self._manager is not None:
@@ -493,6 +568,20 @@ class TuhiKeteShell(cmd.Cmd):
         if self._manager is not None:
             self._manager.terminate()
         self._manager = None
+        # wake up a command waiting for the devices, it will find we're
+        # not connected anymore
+        self._devices_ready.set()
+
+    def onecmd(self, line):
+        # same as cmd.Cmd.onecmd() for known commands, minus the getattr()
+        # on every line
+        command, arg, line = self.parseline(line)
+        func = self._cmd_funcs.get(command)
+        if func is None:
+            return super().onecmd(line)
+
+        self.lastcmd = line if line != 'EOF' else ''
+        return func(arg)
 
     def emptyline(self):
         # make sure we do not re-enter the last typed command
@@ -510,9 +599,15 @@ class TuhiKeteShell(cmd.Cmd):
     def precmd(self, line):
         # Restore the logger facility to something sane:
         self._log_handler.set_normal_mode()
-        if self._manager is None and line not in ['EOF', 'exit', 'help']:
-            print('Not connected to the Tuhi daemon')
-            return ''
+        if line not in ['EOF', 'exit', 'help']:
+            # The manager adds the registered devices asynchronously, a
+            # command typed right after startup would not find them yet
+            if self._manager is not None and not self._devices_ready.wait(5):
+                logger.warning('Timed out waiting for the registered devices')
+
+            if self._manager is None:
+                print('Not connected to the Tuhi daemon')
+                return ''
 
         readline.write_history_file(self._history_file)
         return line
@@ -527,25 +622,64 @@ class TuhiKeteShell(cmd.Cmd):
         return stop
 
     def run(self, init=None):
+        while True:
+            try:
+                self.cmdloop(init)
+                break
+            except KeyboardInterrupt:
+                print('^C')
+                init = ''
+
+    def _parser(self, name):
+        '''
+        Return the argument parser for the command name. Parsers are built
+        once by the matching _build_<name>_parser() and reused afterwards.
+        '''
         try:
-            self.cmdloop(init)
-        except KeyboardInterrupt:
-            print('^C')
-            self.run('')
+            return self._parsers[name]
+        except KeyError:
+            parser = getattr(self, f'_build_{name}_parser')()
+            self._parsers[name] = parser
+            return parser
+
+    def _complete_address(self, text, line, unregistered=False):
+        '''
+        Complete the device address of a command that takes it as its only
+        positional argument, including the unregistered devices if
+        unregistered is True.
+        '''
+        # a trailing space means the next, still empty, field is completed
+        if len(line.split()) + line.endswith(' ') != 2:
+            return []
+
+        # the manager keeps sorted address indices for both device lists,
+        # neither needs a device proxy
+        manager = self._manager
+        prefix = text.upper()
+        completion = manager.addr_prefix(prefix)
+        if unregistered:
+            completion = manager.unregistered_addr_prefix(prefix) + completion
+        return completion
 
     def start_worker(self, worker_class, args=None):
         worker = worker_class(self._manager, args)
         worker.run()
         self._workers.append(worker)
+        if isinstance(worker, Listener) and worker.device is not None:
+            self._listener_by_addr[worker.device.address] = worker
 
     def terminate_worker(self, worker):
         worker.stop()
         self._workers.remove(worker)
+        if isinstance(worker, Listener) and worker.device is not None:
+            if self._listener_by_addr.get(worker.device.address) is worker:
+                del self._listener_by_addr[worker.device.address]
 
     def terminate_workers(self):
         for worker in self._workers:
             worker.stop()
         self._workers = []
+        self._listener_by_addr = {}
 
     def do_devices(self, arg):
         '''List known devices. These are devices previously registered with
@@ -558,23 +692,21 @@ class TuhiKeteShell(cmd.Cmd):
         self.do_listen('-h')
 
     def complete_listen(self, text, line, begidx, endidx):
-        # mark the end of the line so we can match on the number of fields
-        if line.endswith(' '):
-            line += 'm'
         fields = line.split()
+        # a trailing space means the next, still empty, field is completed
+        nfields = len(fields) + line.endswith(' ')
 
         completion = []
-        if len(fields) == 2:
-            for device in self._manager.devices:
-                if device.address.startswith(text.upper()):
-                    completion.append(device.address)
-        elif len(fields) == 3:
+        if nfields == 2:
+            completion = self._manager.addr_prefix(text.upper())
+        elif nfields == 3:
+            prefix = text.lower()
             for v in ('on', 'off'):
-                if v.startswith(text.lower()):
+                if v.startswith(prefix):
                     completion.append(v)
         return completion
 
-    def do_listen(self, args):
+    def _build_listen_parser(self):
         desc = '''Enable or disable listening on the given device. When
         listening, all drawings are downloaded from the device as they
         device allows connections (this usually requires a button press).
@@ -591,6 +723,10 @@ class TuhiKeteShell(cmd.Cmd):
                             help='the address of the device to listen to')
         parser.add_argument('mode', choices=['on', 'off'], nargs='?',
                             const='on', default='on')
+        return parser
+
+    def do_listen(self, args):
+        parser = self._parser('listen')
         try:
             parsed_args = parser.parse_args(args.split())
         except SystemExit:
@@ -599,24 +735,23 @@ class TuhiKeteShell(cmd.Cmd):
         address = parsed_args.address
         mode = parsed_args.mode
 
-        for d in self._manager.devices:
-            if d.address == address:
-                if mode == 'on' and d.listening:
-                    print(f'Already listening on {address}')
-                    return
-                elif mode == 'off' and not d.listening:
-                    print(f'Not listening on {address}')
-                    return
-                break
-        else:
+        try:
+            d = self._manager[address]
+        except KeyError:
             print(f'Device {address} not found')
             return
 
+        if mode == 'on' and d.listening:
+            print(f'Already listening on {address}')
+            return
+        elif mode == 'off' and not d.listening:
+            print(f'Not listening on {address}')
+            return
+
         if mode == 'off':
-            for worker in [w for w in self._workers if isinstance(w, Listener)]:
-                if worker.device.address == address:
-                    self.terminate_worker(worker)
-                    break
+            worker = self._listener_by_addr.get(address)
+            if worker is not None:
+                self.terminate_worker(worker)
             return
 
         self.start_worker(Listener, parsed_args)
@@ -635,9 +770,7 @@ class TuhiKeteShell(cmd.Cmd):
                 display_drawing = f'\033[4m{drawing[:len(substitution)]}\033[0m{drawing[len(substitution):]}'
 
                 try:
-                    t = time.localtime(int(drawing))
-                    t = time.strftime('%Y-%m-%d at %H:%M', t)
-                    print(f'{display_drawing}: drawn on the {t}')
+                    print(f'{display_drawing}: drawn on the {_fmt_ts(int(drawing))}')
                 except ValueError:
                     # 'all' case
                     print(f'{display_drawing}{":":<8} fetch all drawings')
@@ -645,38 +778,31 @@ class TuhiKeteShell(cmd.Cmd):
             print(self.prompt, readline.get_line_buffer(), sep='', end='')
             sys.stdout.flush()
 
-        # mark the end of the line so we can match on the number of fields
-        if line.endswith(' '):
-            line += 'm'
         fields = line.split()
+        # a trailing space means the next, still empty, field is completed
+        nfields = len(fields) + line.endswith(' ')
 
         completion = []
-        if len(fields) == 2:
-            for device in self._manager.devices:
-                if device.address.startswith(text.upper()):
-                    completion.append(device.address)
+        if nfields == 2:
+            completion = self._manager.addr_prefix(text.upper())
 
-        elif len(fields) == 3:
+        elif nfields == 3:
             readline.set_completion_display_matches_hook(draw_timestamp)
-            device = None
-            for d in self._manager.devices:
-                if d.address == fields[1]:
-                    device = d
-                    break
-
+            device = self._manager.get(fields[1].upper())
             if device is None:
                 return
 
-            timestamps = [str(t) for t in d.drawings_available]
+            timestamps = [str(t) for t in device.drawings_available]
             timestamps.append('all')
 
+            prefix = text.lower()
             for t in timestamps:
-                if t.startswith(text.lower()):
+                if t.startswith(prefix):
                     completion.append(t)
 
         return completion
 
-    def do_fetch(self, args):
+    def _build_fetch_parser(self):
         def is_index_or_all(string):
             try:
                 n = int(string)
@@ -708,14 +834,18 @@ class TuhiKeteShell(cmd.Cmd):
                             default='svg',
                             choices=['svg', 'png'],
                             help='output file format')
+        return parser
 
+    def do_fetch(self, args):
+        parser = self._parser('fetch')
         try:
             parsed_args = parser.parse_args(args.split())
         except SystemExit:
             return
 
         # we do not call start_worker() as we don't need to retain the
-        # worker
+        # worker, the pending requests keep it alive until all drawings
+        # are saved
         worker = Fetcher(self._manager, parsed_args, self._config)
         worker.run()
 
@@ -723,20 +853,20 @@ class TuhiKeteShell(cmd.Cmd):
         self.do_search('-h')
 
     def complete_search(self, text, line, begidx, endidx):
-        # mark the end of the line so we can match on the number of fields
-        if line.endswith(' '):
-            line += 'm'
         fields = line.split()
+        # a trailing space means the next, still empty, field is completed
+        nfields = len(fields) + line.endswith(' ')
 
         completion = []
-        if len(fields) == 2:
+        if nfields == 2:
+            prefix = text.lower()
             for v in ('on', 'off'):
-                if v.startswith(text.lower()):
+                if v.startswith(prefix):
                     completion.append(v)
 
         return completion
 
-    def do_search(self, args):
+    def _build_search_parser(self):
         desc = '''
         Start/Stop listening for devices that can be registered with the
         daemon. The devices must be in registration mode (blue LED blinking).
@@ -747,7 +877,10 @@ class TuhiKeteShell(cmd.Cmd):
         parser.add_argument('-h', action='help', help=argparse.SUPPRESS)
         parser.add_argument('mode', choices=['on', 'off'], nargs='?',
                             const='on', default='on')
+        return parser
 
+    def do_search(self, args):
+        parser = self._parser('search')
         try:
             parsed_args = parser.parse_args(args.split())
         except SystemExit:
@@ -771,58 +904,68 @@ class TuhiKeteShell(cmd.Cmd):
         self.do_register('-h')
 
     def complete_register(self, text, line, begidx, endidx):
-        # mark the end of the line so we can match on the number of fields
-        if line.endswith(' '):
-            line += 'm'
-        fields = line.split()
+        # do_register refuses to do anything unless we're searching
+        if not self._manager.searching:
+            return []
 
-        completion = []
-        if len(fields) == 2:
-            for device in self._manager.unregistered_devices + self._manager.devices:
-                if device.address.startswith(text.upper()):
-                    completion.append(device.address)
-
-        return completion
-
-    def do_register(self, args):
-        if not self._manager.searching and '-h' not in args.split():
-            print('please call search first')
-            return
+        return self._complete_address(text, line, unregistered=True)
 
+    def _build_register_parser(self):
         desc = '''
         Register the given device. The device must be in registration mode
         (blue LED blinking).
         '''
         parser = argparse.ArgumentParser(prog='register',
                                          description=desc,
-                                         add_help=False)
+                                         add_help=False,
+                                         exit_on_error=False)
         parser.add_argument('-h', action='help', help=argparse.SUPPRESS)
         parser.add_argument('address', metavar='12:34:56:AB:CD:EF',
                             type=tuhi.dbusclient.TuhiDBusClientDevice.is_device_address,
                             default=None,
                             help='the address of the device to register')
+        return parser
 
-        try:
-            parsed_args = parser.parse_args(args.split())
-        except SystemExit:
+    def do_register(self, args):
+        args = args.split()
+        if not self._manager.searching and '-h' not in args:
+            print('please call search first')
             return
 
-        address = parsed_args.address
+        # a single valid address is the only thing we accept, leave
+        # everything else (-h, errors) to argparse
+        if len(args) == 1 and looks_like_address(args[0]):
+            address = args[0]
+        else:
+            parser = self._parser('register')
+            try:
+                address = parser.parse_args(args).address
+            except argparse.ArgumentError as e:
+                print(f'error: {e}')
+                return
+            except SystemExit:
+                # -h, or an error argparse still reports itself
+                return
 
         device = None
 
         # make sure we do not keep a listener on the device
-        for worker in [w for w in self._workers if isinstance(w, Listener)]:
-            if worker.device.address == address:
-                self.terminate_worker(worker)
+        worker = self._listener_by_addr.get(address)
+        if worker is not None:
+            self.terminate_worker(worker)
 
-        for d in self._manager.devices + self._manager.unregistered_devices:
-            if d.address == address:
-                device = d
-                break
-        else:
-            logger.error(f'{address}: device not found')
-            return
+        try:
+            device = self._manager[address]
+        except KeyError:
+            # unregistered devices only exist during a search and there are
+            # few of them, a scan is good enough here
+            for d in self._manager.unregistered_devices:
+                if d.address == address:
+                    device = d
+                    break
+            else:
+                logger.error(f'{address}: device not found')
+                return
 
         device.register()
 
@@ -830,74 +973,80 @@ class TuhiKeteShell(cmd.Cmd):
         self.do_info('-h')
 
     def complete_info(self, text, line, begidx, endidx):
-        # mark the end of the line so we can match on the number of fields
-        if line.endswith(' '):
-            line += 'm'
-        fields = line.split()
+        return self._complete_address(text, line)
 
-        completion = []
-        if len(fields) == 2:
-            for device in self._manager.devices:
-                if device.address.startswith(text):
-                    completion.append(device.address)
-
-        return completion
-
-    def do_info(self, args):
+    def _build_info_parser(self):
         desc = '''
         Show information about the given device. If no device is given, show
         information about all known devices'''
         parser = argparse.ArgumentParser(prog='info',
                                          description=desc,
-                                         add_help=False)
+                                         add_help=False,
+                                         exit_on_error=False)
         parser.add_argument('-h', action='help', help=argparse.SUPPRESS)
         parser.add_argument('address', metavar='12:34:56:AB:CD:EF',
                             type=tuhi.dbusclient.TuhiDBusClientDevice.is_device_address,
                             default=None, nargs='?',
                             help='the address of the device to listen to')
+        return parser
 
-        try:
-            parsed_args = parser.parse_args(args.split())
-        except SystemExit:
-            return
+    def do_info(self, args):
+        args = args.split()
+        # no argument or a single valid address are the only things we
+        # accept, leave everything else (-h, errors) to argparse
+        if not args:
+            address = None
+        elif len(args) == 1 and looks_like_address(args[0]):
+            address = args[0]
+        else:
+            try:
+                address = self._parser('info').parse_args(args).address
+            except argparse.ArgumentError as e:
+                print(f'error: {e}')
+                return
+            except SystemExit:
+                # -h, or an error argparse still reports itself
+                return
 
-        for device in self._manager.devices:
-            if parsed_args.address is None or parsed_args.address == device.address:
-                print(device)
-                charge_strs = {
-                    0: 'unknown',
-                    1: 'charging',
-                    2: 'discharging'
-                }
-                try:
-                    charge_str = charge_strs[device.battery_state]
-                except KeyError:
-                    charge_str = 'invalid'
-                print(f'\tBattery level: {device.battery_percent}%, {charge_str}')
-                print('\tAvailable drawings:')
-                for d in device.drawings_available:
-                    t = time.localtime(d)
-                    t = time.strftime('%Y-%m-%d at %H:%M', t)
-                    print(f'\t\t* {d}: drawn on the {t}')
+        if address is None:
+            devices = self._manager.devices
+        else:
+            device = self._manager.get(address)
+            devices = [device] if device is not None else []
+
+        # collect everything and write it out in one go
+        lines = []
+        for device in devices:
+            state = device.battery_state
+            if state in range(len(CHARGE_STRS)):
+                charge_str = CHARGE_STRS[state]
+            else:
+                charge_str = 'invalid'
+            lines.append(str(device))
+            lines.append(f'\tBattery level: {device.battery_percent}%, {charge_str}')
+            lines.append('\tAvailable drawings:')
+            lines.extend(f'\t\t* {d}: drawn on the {_fmt_ts(d)}'
+                         for d in device.drawings_available)
+
+        if lines:
+            sys.stdout.write('\n'.join(lines) + '\n')
 
     def complete_enable_live(self, text, line, begidx, endidx):
-        # mark the end of the line so we can match on the number of fields
-        if line.endswith(' '):
-            line += 'm'
         fields = line.split()
+        # a trailing space means the next, still empty, field is completed
+        nfields = len(fields) + line.endswith(' ')
 
         completion = []
-        if len(fields) == 2:
-            for device in self._manager.devices:
-                if device.address.startswith(text.upper()):
-                    completion.append(device.address)
-        elif len(fields) == 3:
+        if nfields == 2:
+            completion = self._manager.addr_prefix(text.upper())
+        elif nfields == 3:
+            prefix = text.lower()
             for v in ('on', 'off'):
-                if v.startswith(text.lower()):
+                if v.startswith(prefix):
                     completion.append(v)
         return completion
 
-    def do_enable_live(self, args):
+    def _build_enable_live_parser(self):
         desc = '''Enable or disable live mode on a particular device'''
         parser = argparse.ArgumentParser(prog='enable_live',
                                          description=desc,
@@ -909,7 +1058,10 @@ class TuhiKeteShell(cmd.Cmd):
                             help='the address of the device to listen to')
         parser.add_argument('mode', choices=['on', 'off'], nargs='?',
                             const='on', default='on')
+        return parser
 
+    def do_enable_live(self, args):
+        parser = self._parser('enable_live')
         try:
             parsed_args = parser.parse_args(args.split())
         except SystemExit:
@@ -918,22 +1070,24 @@ class TuhiKeteShell(cmd.Cmd):
         address = parsed_args.address
         mode = parsed_args.mode
 
-        for d in self._manager.devices:
-            if d.address == address:
-                if mode == 'on' and d.live:
-                    print(f'Live mode already enabled on {address}')
-                    return
-                elif mode == 'off' and not d.live:
-                    print(f'Live mode not started on  {address}')
-                    return
-                break
-        else:
+        try:
+            d = self._manager[address]
+        except KeyError:
             print(f'Device {address} not found')
             return
 
+        if mode == 'on' and d.live:
+            print(f'Live mode already enabled on {address}')
+            return
+        elif mode == 'off' and not d.live:
+            print(f'Live mode not started on  {address}')
+            return
+
         if mode == 'off':
-            for worker in [w for w in self._workers if isinstance(w, LiveChanger)]:
-                if worker.device.address == address:
+            # d comes from the manager's dict, so is the same object our
+            # LiveChanger holds
+            for worker in self._workers:
+                if isinstance(worker, LiveChanger) and worker.device is d:
                     self.terminate_worker(worker)
                     break
             return
@@ -72,19 +72,17 @@ def parse_file(filename, file_format, tablet_model, orientation):
         jsonname = f'{stem}.json'
         d = Drawing(svgname, (width * point_size, height * point_size), timestamp)
 
-        def normalize(p):
-            NORMALIZED_RANGE = 0x10000
-            return NORMALIZED_RANGE * p / pressure
+        NORMALIZED_RANGE = 0x10000
 
         for s in f.strokes:
             stroke = d.new_stroke()
-            for p in s.points:
-                stroke.new_abs((p.x * point_size, p.y * point_size), normalize(p.p))
+            stroke.extend_abs([(p.x * point_size, p.y * point_size) for p in s.points],
+                              [NORMALIZED_RANGE * p.p / pressure for p in s.points])
             stroke.seal()
         d.seal()
         if file_format == 'json':
             with open(jsonname, 'w') as fd:
-                fd.write(d.to_json())
+                fd.write(d.to_json(indent=2))
             return
         else:
             from io import StringIO
@@ -15,9 +15,9 @@ import argparse
 import logging
 import os
 import pwd
+import socket
 import sys
 import multiprocessing
-from multiprocessing import reduction
 
 try:
     import tuhi.dbusclient
@@ -31,23 +31,32 @@ except ModuleNotFoundError:
 
 manager = None
 logger = None
+connection = None
 
 
-def open_uhid_process(queue_in, conn_out):
+def open_uhid_process(sock):
+    # every request byte on sock is answered with a new /dev/uhid fd
     while True:
         try:
-            pid = queue_in.get()
+            if not sock.recv(1):
+                return 0
         except KeyboardInterrupt:
             return 0
         else:
             fd = os.open('/dev/uhid', os.O_RDWR)
-            reduction.send_handle(conn_out, fd, pid)
+            socket.send_fds(sock, [b'\0'], [fd])
+            os.close(fd)
 
 
-def maybe_start_tuhi(queue):
+def maybe_start_tuhi(recv_conn, send_conn):
+    # the parent sends exactly one (should_start, args) message. A forked
+    # child inherits the sending end too, close it so we see EOF if the
+    # parent goes away first.
+    send_conn.close()
     try:
-        should_start, args = queue.get()
-    except KeyboardInterrupt:
+        with recv_conn:
+            should_start, args = recv_conn.recv()
+    except (KeyboardInterrupt, EOFError):
         return 0
 
     if not should_start:
@@ -68,11 +77,12 @@ def maybe_start_tuhi(queue):
 
 
 def start_tuhi_server(args):
-    queue = multiprocessing.Queue()
+    recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
 
-    tuhi_process = multiprocessing.Process(target=maybe_start_tuhi, args=(queue,))
+    tuhi_process = multiprocessing.Process(target=maybe_start_tuhi, args=(recv_conn, send_conn))
     tuhi_process.daemon = True
     tuhi_process.start()
+    recv_conn.close()
 
     sys.path.append(os.path.join(os.getcwd(), 'tools'))
 
@@ -87,7 +97,8 @@ def start_tuhi_server(args):
 
     logger.debug('connecting to the bus')
 
-    # connect to the session
+    # connect to the session, run_live() reuses this connection
+    global connection
     try:
         connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
     except GLib.Error as e:
@@ -118,31 +129,46 @@ def start_tuhi_server(args):
     if not started:
         print(f'No-one is handling {tuhi.dbusclient.TUHI_DBUS_NAME}, attempting to start a daemon')
 
-    queue.put((not started, args))
+    with send_conn:
+        send_conn.send((not started, args))
 
 
-def run_live(request_fd_queue, conn_fd):
+def run_live(uhid_sock):
     from gi.repository import Gio, GLib
 
-    def on_name_appeared(connection, name, client):
-        global manager
-        logger.info('Connected to the Tuhi daemon')
-        manager = tuhi.dbusclient.TuhiDBusClientManager()
+    live_devices = set()
 
+    def on_devices(manager, pspec):
+        # the manager adds the registered devices as they become ready
         for device in manager.devices:
+            if device in live_devices:
+                continue
+            live_devices.add(device)
+
             if device.live:
                 logger.info(f'{device} is already live, stopping first')
                 device.stop_live()
             logger.info(f'starting live on {device}, please press button on the device')
-            request_fd_queue.put(os.getpid())
-            fd = reduction.recv_handle(conn_fd)
-            device.start_live(fd)
+            uhid_sock.send(b'\0')
+            _, fds, _, _ = socket.recv_fds(uhid_sock, 1, 1)
+            # start_live() sends a duplicate of the fd
+            try:
+                device.start_live(fds[0])
+            finally:
+                os.close(fds[0])
+
+    def on_name_appeared(connection, name, client):
+        global manager
+        logger.info('Connected to the Tuhi daemon')
+        manager = tuhi.dbusclient.TuhiDBusClientManager()
+        manager.connect('notify::devices', on_devices)
+        on_devices(manager, None)
 
-    Gio.bus_watch_name(Gio.BusType.SESSION,
-                       tuhi.dbusclient.TUHI_DBUS_NAME,
-                       Gio.BusNameWatcherFlags.NONE,
-                       on_name_appeared,
-                       None)
+    Gio.bus_watch_name_on_connection(connection,
+                                     tuhi.dbusclient.TUHI_DBUS_NAME,
+                                     Gio.BusNameWatcherFlags.NONE,
+                                     on_name_appeared,
+                                     None)
 
     mainloop = GLib.MainLoop()
 
@@ -210,12 +236,14 @@ def main(args=sys.argv):
         sys.exit('Script must be run as root')
 
     our_args, remaining_args = parse(args)
-    request_fd_queue = multiprocessing.Queue()
-    conn_in, conn_out = multiprocessing.Pipe()
+    # /dev/uhid needs root, so a child opens it for us and passes the fds
+    # back over this socket once we've dropped our privileges
+    uhid_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
 
-    fd_process = multiprocessing.Process(target=open_uhid_process, args=(request_fd_queue, conn_out))
+    fd_process = multiprocessing.Process(target=open_uhid_process, args=(child_sock,))
     fd_process.daemon = True
     fd_process.start()
+    child_sock.close()
 
     drop_privileges()
 
@@ -232,7 +260,7 @@ def main(args=sys.argv):
         os.environ['XDG_CACHE_HOME'] = os.fspath(basedir / 'cache')
 
     start_tuhi_server(remaining_args)
-    run_live(request_fd_queue, conn_in)
+    run_live(uhid_sock)
 
 
 if __name__ == '__main__':
@@ -15,6 +15,7 @@ import argparse
 import enum
 import logging
 import sys
+import threading
 import time
 import xdg.BaseDirectory
 from pathlib import Path
@@ -79,6 +80,11 @@ class TuhiDevice(GObject.Object):
 
         self._tuhi_dbus_device = None
 
+        # drawings arrive from the WacomDevice thread, we pass them on to
+        # the DBus device in batches from the main loop
+        self._pending_drawings = []
+        self._pending_drawings_lock = threading.Lock()
+
     @GObject.Property
     def dimensions(self):
         if self._wacom_device is None:
@@ -120,14 +126,12 @@ class TuhiDevice(GObject.Object):
         assert self._tuhi_dbus_device is None
         self._tuhi_dbus_device = device
         self._tuhi_dbus_device.connect('register-requested', self._on_register_requested)
-        self._tuhi_dbus_device.connect('notify::listening', self._on_listening_updated)
         self._tuhi_dbus_device.connect('notify::live', self._on_live_updated)
 
         drawings = self.config.load_drawings(self.address)
         if drawings:
             logger.debug(f'{self.address}: loaded {len(drawings)} drawings from disk')
-        for d in drawings:
-            self._tuhi_dbus_device.add_drawing(d)
+            self._tuhi_dbus_device.add_drawings(drawings)
 
     @GObject.Property
     def listening(self):
@@ -219,9 +223,22 @@ class TuhiDevice(GObject.Object):
 
     def _on_drawing_received(self, device, drawing):
         logger.debug('Drawing received')
-        self._tuhi_dbus_device.add_drawing(drawing)
         self.config.store_drawing(self.address, drawing)
 
+        # When the device has a backlog, the drawings arrive back-to-back.
+        # Collect them so DrawingsAvailable changes once for all of them.
+        with self._pending_drawings_lock:
+            if not self._pending_drawings:
+                GLib.idle_add(self._flush_drawings, priority=GLib.PRIORITY_HIGH_IDLE)
+            self._pending_drawings.append(drawing)
+
+    def _flush_drawings(self):
+        with self._pending_drawings_lock:
+            drawings = self._pending_drawings
+            self._pending_drawings = []
+        self._tuhi_dbus_device.add_drawings(drawings)
+        return False
+
     def _on_fetching_finished(self, device, exception, bluez_device):
         if self.live:
             return
@@ -240,10 +257,6 @@ class TuhiDevice(GObject.Object):
         # next connection request.
         self.mode = DeviceMode.LISTEN
 
-    def _on_listening_updated(self, dbus_device, pspec):
-        # Callback when a DBus client calls Start/Stop listening
-        self.notify('listening')
-
     def _on_live_updated(self, dbus_device, pspec):
         if self.live:
             self._connect_device(DeviceMode.LIVE)
@@ -304,6 +317,11 @@ class Tuhi(GObject.Object):
         self.devices = {}
 
         self._search_stop_handler = None
+        # BlueZ devices with updates not yet processed
+        self._pending_updates = set()
+        # the devices currently listening, so we don't have to look at
+        # all of them whenever one changes
+        self._listening_devices = set()
 
     def _on_tuhi_bus_name_acquired(self, dbus_server):
         self.bluez.connect_to_bluez()
@@ -312,8 +330,7 @@ class Tuhi(GObject.Object):
 
         self.bluez.connect('device-added',
                            lambda mgr, dev: self._add_device(mgr, dev, True))
-        self.bluez.connect('device-updated',
-                           lambda mgr, dev: self._add_device(mgr, dev, True))
+        self.bluez.connect('device-updated', self._on_bluez_device_updated)
 
     def _on_tuhi_bus_name_lost(self, dbus_server):
         self.emit('terminate')
@@ -332,7 +349,7 @@ class Tuhi(GObject.Object):
 
         unregistered = [addr for (addr, d) in self.devices.items() if not d.registered]
         for addr in unregistered:
-            del self.devices[addr]
+            self._listening_devices.discard(self.devices.pop(addr).dbus_device)
 
     def _on_bluez_discovery_started(self, manager):
         # Something else may turn discovery mode on, we don't care about
@@ -347,6 +364,26 @@ class Tuhi(GObject.Object):
         # restart discovery if some users are already in the listening mode
         self._on_listening_updated(None, None)
 
+    def _on_bluez_device_updated(self, manager, bluez_device):
+        # BlueZ sends an update for every property change, during discovery
+        # that's a constant stream of RSSI and ManufacturerData changes.
+        # Collect them and process each device once when we're idle,
+        # looking at whatever state it is in by then. These are the least
+        # urgent events we have, so we don't let them get in the way of
+        # the DBus clients and the devices we're talking to.
+        if not self._pending_updates:
+            GLib.idle_add(self._flush_device_updates, priority=GLib.PRIORITY_LOW)
+        # BlueZDeviceManager passes the same object for every update of
+        # a device, so it's a key that doesn't need a DBus property read
+        self._pending_updates.add(bluez_device)
+
+    def _flush_device_updates(self):
+        pending = self._pending_updates
+        self._pending_updates = set()
+        for bluez_device in pending:
+            self._add_device(self.bluez, bluez_device, True)
+        return False
+
     def _add_device(self, manager, bluez_device, from_live_update=False):
         '''
         Process a new BlueZ device that may be one of our devices.
@@ -364,17 +401,24 @@ class Tuhi(GObject.Object):
         # who doesn't look like we know them to avoid potentially bricking a
         # device. If the vendor id is None it may still be one of our
         # devices, provided it's been registered previously.
-        if bluez_device.vendor_id is not None and bluez_device.vendor_id not in WACOM_COMPANY_IDS:
+        #
+        # Every BlueZDevice property goes through the DBus proxy and
+        # unpacks a fresh value, so we read each one only once here.
+        vendor_id = bluez_device.vendor_id
+        if vendor_id is not None and vendor_id not in WACOM_COMPANY_IDS:
             return
 
-        # check if the device is already known to us
-        try:
-            config = self.config.devices[bluez_device.address]
-            uuid = config['uuid']
-        except KeyError:
-            if bluez_device.vendor_id is None:
-                return
+        address = bluez_device.address
+
+        # check if the device is already known to us. Most devices seen
+        # during discovery aren't, so avoid raising KeyError for them.
+        config = self.config.devices.get(address)
+        if config is not None:
+            uuid = config.get('uuid')
+        else:
             uuid = None
+        if uuid is None and vendor_id is None:
+            return
 
         # if we got here from a currently live BlueZ device,
         # ManufacturerData is reliable. Else, consider the device not in
@@ -388,33 +432,35 @@ class Tuhi(GObject.Object):
         else:
             mode = DeviceMode.LISTEN
             if uuid is None:
-                logger.info(f'{bluez_device.address}: device without config, must be registered first')
+                logger.info('%s: device without config, must be registered first', address)
                 return
-            logger.debug(f'{bluez_device.address}: UUID {uuid} protocol: {config["Protocol"]}')
+            # called for every BlueZ update, let logging do the formatting
+            logger.debug('%s: UUID %s protocol: %s', address, uuid, config['Protocol'])
 
         # create the device if unknown from us
-        if bluez_device.address not in self.devices:
+        d = self.devices.get(address)
+        if d is None:
             d = TuhiDevice(bluez_device, self.config, uuid, mode)
             d.dbus_device = self.server.create_device(d)
-            d.connect('notify::listening', self._on_listening_updated)
-            self.devices[bluez_device.address] = d
-
-        d = self.devices[bluez_device.address]
+            # TuhiDevice.listening is the DBus device's property, so
+            # listen to the source directly
+            d.dbus_device.connect('notify::listening', self._on_listening_updated)
+            self.devices[address] = d
 
         if mode == DeviceMode.REGISTER:
             d.mode = mode
-            logger.debug(f'{bluez_device.objpath}: call Register() on device')
+            logger.debug('%s: call Register() on device', bluez_device.objpath)
         elif d.listening:
             d.listen()
 
-    def _on_listening_updated(self, tuhi_dbus_device, pspec):
-        listen = self._search_stop_handler is not None
-        for dev in self.devices.values():
-            if dev.listening:
-                listen = True
-                break
+    def _on_listening_updated(self, dbus_device, pspec):
+        if dbus_device is not None:
+            if dbus_device.listening:
+                self._listening_devices.add(dbus_device)
+            else:
+                self._listening_devices.discard(dbus_device)
 
-        if listen:
+        if self._listening_devices or self._search_stop_handler is not None:
             self.bluez.start_discovery()
         else:
             self.bluez.stop_discovery()
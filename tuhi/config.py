@@ -118,7 +118,7 @@ class TuhiConfig(GObject.Object):
         path = Path(self._base_path, address, f'{drawing.timestamp}.json')
 
         with open(path, 'w') as f:
-            f.write(drawing.to_json())
+            f.write(drawing.to_json(indent=2))
 
     def load_drawings(self, address):
         assert is_btaddr(address)
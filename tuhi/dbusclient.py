@@ -13,10 +13,12 @@
 
 from gi.repository import GObject, Gio, GLib
 import argparse
+import bisect
 import errno
 import os
 import logging
 import re
+import threading
 
 logger = logging.getLogger('tuhi.dbusclient')
 
@@ -27,6 +29,12 @@ ROOT_PATH = '/org/freedesktop/tuhi1'
 
 ORG_BLUEZ_DEVICE1 = 'org.bluez.Device1'
 
+# Tuhi and BlueZ are not activatable by us, don't make the bus try to
+# start them when they're not running
+_PROXY_FLAGS = Gio.DBusProxyFlags.DO_NOT_AUTO_START
+
+_ADDR_RE = re.compile(r'[0-9a-fA-F]{2}(?::[0-9a-fA-F]{2}){5}\Z')
+
 
 class DBusError(Exception):
     def __init__(self, message):
@@ -36,7 +44,7 @@ class DBusError(Exception):
 class _DBusObject(GObject.Object):
     _connection = None
 
-    def __init__(self, name, interface, objpath):
+    def __init__(self, name, interface, objpath, proxy=None):
         super().__init__()
 
         # this is not handled asynchronously because if we fail to
@@ -48,20 +56,33 @@ class _DBusObject(GObject.Object):
         self.objpath = objpath
         self._online = False
         self._name = name
+        # property() may be called from a thread other than the one
+        # running the GLib mainloop (kete), this lock covers both dicts
+        self._props_lock = threading.Lock()
+        self._props = {}
+        self._raw_props = {}
+        self.proxy = None
+        self._proxy_signals = []
         try:
-            self._connect()
+            self._connect(proxy)
         except DBusError:
             self._reconnect_timer = GObject.timeout_add_seconds(2, self._on_reconnect_timer)
 
-    def _connect(self):
+    def _connect(self, proxy=None):
+        '''
+        Connect to our object, using proxy if the caller already created
+        one for us.
+        '''
         try:
-            self.proxy = Gio.DBusProxy.new_sync(self._connection,
-                                                Gio.DBusProxyFlags.NONE, None,
-                                                self._name, self.objpath,
-                                                self.interface, None)
+            if proxy is None:
+                proxy = Gio.DBusProxy.new_sync(self._connection, _PROXY_FLAGS,
+                                               None, self._name, self.objpath,
+                                               self.interface, None)
+            self.proxy = proxy
             if self.proxy.get_name_owner() is None:
                 raise DBusError(f'No-one is handling {self._name}, is the daemon running?')
 
+            self._load_properties()
             self._online = True
             self.notify('online')
         except GLib.Error as e:
@@ -71,8 +92,20 @@ class _DBusObject(GObject.Object):
             else:
                 raise e
 
-        self.proxy.connect('g-properties-changed', self._on_properties_changed)
-        self.proxy.connect('g-signal', self._on_signal_received)
+        self._proxy_signals = [
+            self.proxy.connect('g-properties-changed', self._on_proxy_properties_changed),
+            self.proxy.connect('g-signal', self._on_signal_received),
+        ]
+
+    def _load_properties(self):
+        # The proxy fetched all properties during construction. We keep
+        # the GVariants and only unpack a property the first time
+        # property() asks for it, most of them are never read.
+        raw_props = {name: self.proxy.get_cached_property(name)
+                     for name in self.proxy.get_cached_property_names() or []}
+        with self._props_lock:
+            self._props = {}
+            self._raw_props = raw_props
 
     def _on_reconnect_timer(self):
         try:
@@ -96,8 +129,21 @@ class _DBusObject(GObject.Object):
             else:
                 raise e
 
+    def _on_proxy_properties_changed(self, proxy, changed_props, invalidated_props):
+        names = changed_props.keys() if changed_props is not None else []
+        with self._props_lock:
+            for name in names:
+                self._raw_props[name] = changed_props.lookup_value(name, None)
+                self._props.pop(name, None)
+            for name in invalidated_props or []:
+                self._raw_props.pop(name, None)
+                self._props.pop(name, None)
+        self._on_properties_changed(proxy, names, invalidated_props)
+
     def _on_properties_changed(self, proxy, changed_props, invalidated_props):
-        # Implement this in derived classes to respond to property changes
+        # Implement this in derived classes to respond to property changes,
+        # changed_props is the list of the changed property names, use
+        # property() for their values
         pass
 
     def _on_signal_received(self, proxy, sender, signal, parameters):
@@ -105,13 +151,47 @@ class _DBusObject(GObject.Object):
         pass
 
     def property(self, name):
-        p = self.proxy.get_cached_property(name)
-        if p is not None:
-            return p.unpack()
-        return p
+        try:
+            return self._props[name]
+        except KeyError:
+            pass
+
+        # The variant stays in _raw_props so a concurrent reader can
+        # unpack it too, and the lock keeps a PropertiesChanged update
+        # from being overwritten by the value it replaced
+        with self._props_lock:
+            try:
+                return self._props[name]
+            except KeyError:
+                pass
+
+            variant = self._raw_props.get(name)
+            if variant is None:
+                return None
+            value = variant.unpack()
+            self._props[name] = value
+            return value
+
+    def _call(self, method, parameters=None, reply_type=None):
+        '''
+        Call method on our object directly on the connection, bypassing
+        the proxy's method call machinery. Returns the unpacked reply.
+        '''
+        if reply_type is not None:
+            reply_type = GLib.VariantType.new(reply_type)
+        result = self._connection.call_sync(self._name, self.objpath,
+                                            self.interface, method,
+                                            parameters, reply_type,
+                                            Gio.DBusCallFlags.NONE, -1,
+                                            None)
+        return result.unpack()
 
     def terminate(self):
-        del self.proxy
+        if self.proxy is not None:
+            for sig in self._proxy_signals:
+                self.proxy.disconnect(sig)
+        self._proxy_signals = []
+        self.proxy = None
 
 
 class _DBusSystemObject(_DBusObject):
@@ -136,17 +216,20 @@ class _DBusSystemObject(_DBusObject):
 class BlueZDevice(_DBusSystemObject):
     def __init__(self, objpath):
         super().__init__('org.bluez', ORG_BLUEZ_DEVICE1, objpath)
-        self.proxy.connect('g-properties-changed', self._on_properties_changed)
 
     @GObject.Property
     def connected(self):
-        return self.proxy.get_cached_property('Connected').unpack()
+        return self.property('Connected')
 
-    def _on_properties_changed(self, obj, properties, invalidated_properties):
-        properties = properties.unpack()
+    @GObject.Property
+    def name(self):
+        return self.property('Name')
 
+    def _on_properties_changed(self, obj, properties, invalidated_properties):
         if 'Connected' in properties:
             self.notify('connected')
+        if 'Name' in properties:
+            self.notify('name')
 
 
 class TuhiDBusClientDevice(_DBusObject):
@@ -159,23 +242,47 @@ class TuhiDBusClientDevice(_DBusObject):
             (GObject.SignalFlags.RUN_FIRST, None, (int,)),
     }
 
-    def __init__(self, manager, objpath):
-        super().__init__(TUHI_DBUS_NAME, ORG_FREEDESKTOP_TUHI1_DEVICE, objpath)
+    # DBus property name to the GObject property we notify about
+    _PROP_NOTIFY = {
+        'DrawingsAvailable': 'drawings-available',
+        'Listening': 'listening',
+        'BatteryPercent': 'battery-percent',
+        'BatteryState': 'battery-state',
+        'Live': 'live',
+    }
+
+    def __init__(self, manager, objpath, proxy=None):
+        super().__init__(TUHI_DBUS_NAME, ORG_FREEDESKTOP_TUHI1_DEVICE, objpath,
+                         proxy=proxy)
         self.manager = manager
         self.is_registering = False
+        self._mgr_devices_signal = None
         self._bluez_device = BlueZDevice(self.property('BlueZDevice'))
         self._bluez_device.connect('notify::connected', self._on_connected)
+        self._bluez_device.connect('notify::name', self._on_name_changed)
         self._sync_state = 0
+        # a device's address never changes, cached on first use
+        self._address = None
+        # cached __repr__, address and name rarely change
+        self._repr = None
+        # GObject properties to notify about from the next idle callback
+        self._pending_notifies = set()
+        self._notify_source = None
+        # False once the daemon told us it doesn't know GetJSONDataFd
+        self._has_json_data_fd = True
 
     @classmethod
     def is_device_address(cls, string):
-        if re.match(r'[0-9a-f]{2}(:[0-9a-f]{2}){5}$', string.lower()):
+        # cheap length and separator check before running the regex
+        if len(string) == 17 and string[2::3] == ':::::' and _ADDR_RE.match(string):
             return string
         raise argparse.ArgumentTypeError(f'"{string}" is not a valid device address')
 
     @GObject.Property
     def address(self):
-        return self._bluez_device.property('Address')
+        if self._address is None:
+            self._address = self._bluez_device.property('Address')
+        return self._address
 
     @GObject.Property
     def name(self):
@@ -216,40 +323,125 @@ class TuhiDBusClientDevice(_DBusObject):
     def _on_connected(self, bluez_device, pspec):
         self.notify('connected')
 
+    def _on_name_changed(self, bluez_device, pspec):
+        self._repr = None
+        self.notify('name')
+
     def register(self):
-        logger.debug(f'{self}: Register')
+        logger.debug('%s: Register', self)
         # FIXME: Register() doesn't return anything useful yet, so we wait until
         # the device is in the Manager's Devices property
-        self.s1 = self.manager.connect('notify::devices', self._on_mgr_devices_updated)
+        self._mgr_devices_signal = self.manager.connect('notify::devices', self._on_mgr_devices_updated)
         self.is_registering = True
-        self.proxy.Register()
+        self._call('Register')
 
     def start_listening(self):
-        self.proxy.StartListening()
+        self._call('StartListening')
 
     def stop_listening(self):
         try:
-            self.proxy.StopListening()
+            self._call('StopListening')
         except GLib.Error as e:
             if (e.domain != 'g-dbus-error-quark' or
                     e.code != Gio.IOErrorEnum.EXISTS or
                     Gio.dbus_error_get_remote_error(e) != 'org.freedesktop.DBus.Error.ServiceUnknown'):
                 raise e
 
+    SUPPORTED_FILE_FORMAT = 1
+
     def json(self, timestamp):
-        SUPPORTED_FILE_FORMAT = 1
-        return self.proxy.GetJSONData('(ut)', SUPPORTED_FILE_FORMAT, timestamp)
+        args = GLib.Variant('(ut)', (self.SUPPORTED_FILE_FORMAT, timestamp))
+        if self._has_json_data_fd:
+            try:
+                result, fd_list = self._connection.call_with_unix_fd_list_sync(
+                    self._name, self.objpath, self.interface, 'GetJSONDataFd',
+                    args, GLib.VariantType.new('(h)'), Gio.DBusCallFlags.NONE, -1,
+                    None, None)
+                return self._read_json_fd(result, fd_list)
+            except GLib.Error as e:
+                if not self._is_unknown_method(e):
+                    raise e
+                self._has_json_data_fd = False
+
+        return self._call('GetJSONData', args, '(s)')[0]
+
+    def json_async(self, timestamp, callback):
+        '''
+        Request the JSON data for the drawing with the given timestamp
+        without waiting for the reply. callback is invoked as
+        callback(device, timestamp, jsondata, error). If the request
+        failed, jsondata is None and error is the GLib.Error, otherwise
+        error is None. jsondata is an empty string if the daemon doesn't
+        have that drawing.
+        '''
+        args = GLib.Variant('(ut)', (self.SUPPORTED_FILE_FORMAT, timestamp))
+
+        def on_reply(connection, res, data):
+            try:
+                result, fd_list = connection.call_with_unix_fd_list_finish(res)
+                jsondata = self._read_json_fd(result, fd_list)
+            except GLib.Error as e:
+                if self._is_unknown_method(e):
+                    self._has_json_data_fd = False
+                    get_json_data()
+                    return
+                logger.debug('%s: GetJSONDataFd() failed: %s', self.objpath, e.message)
+                callback(self, timestamp, None, e)
+                return
+            callback(self, timestamp, jsondata, None)
+
+        def on_fallback_reply(connection, res, data):
+            try:
+                jsondata = connection.call_finish(res).unpack()[0]
+            except GLib.Error as e:
+                logger.debug('%s: GetJSONData() failed: %s', self.objpath, e.message)
+                callback(self, timestamp, None, e)
+                return
+            callback(self, timestamp, jsondata, None)
+
+        def get_json_data():
+            self._connection.call(
+                self._name, self.objpath, self.interface, 'GetJSONData',
+                args, GLib.VariantType.new('(s)'), Gio.DBusCallFlags.NONE, -1,
+                None, on_fallback_reply, None)
+
+        if not self._has_json_data_fd:
+            get_json_data()
+            return
+
+        self._connection.call_with_unix_fd_list(
+            self._name, self.objpath, self.interface, 'GetJSONDataFd',
+            args, GLib.VariantType.new('(h)'), Gio.DBusCallFlags.NONE, -1,
+            None, None, on_reply, None)
+
+    @staticmethod
+    def _is_unknown_method(error):
+        # daemons older than GetJSONDataFd only have GetJSONData
+        return error.matches(Gio.dbus_error_quark(), Gio.DBusError.UNKNOWN_METHOD)
+
+    @staticmethod
+    def _read_json_fd(result, fd_list):
+        '''
+        The daemon hands us the JSON data in a memfd rather than as a
+        string in the reply. Returns the string read from that fd.
+        '''
+        fd = fd_list.steal_fds()[result.unpack()[0]]
+        with os.fdopen(fd, encoding='utf-8') as f:
+            return f.read()
 
     def _on_signal_received(self, proxy, sender, signal, parameters):
+        # the daemon updates its properties before sending a signal, make
+        # sure our listeners see those updates before the signal too
+        self._flush_notifies()
         if signal == 'ButtonPressRequired':
-            logger.info(f'{self}: Press button on device now')
+            logger.info('%s: Press button on device now', self)
             self.emit('button-press-required')
         elif signal == 'ListeningStopped':
             err = parameters[0]
             if err == -errno.EACCES:
-                logger.error(f'{self}: wrong device, please re-register.')
+                logger.error('%s: wrong device, please re-register.', self)
             elif err < 0:
-                logger.error(f'{self}: an error occured: {os.strerror(-err)}')
+                logger.error('%s: an error occured: %s', self, os.strerror(-err))
             self.emit('device-error', err)
             self.notify('listening')
         elif signal == 'SyncState':
@@ -257,56 +449,88 @@ class TuhiDBusClientDevice(_DBusObject):
             self.notify('sync-state')
 
     def _on_properties_changed(self, proxy, changed_props, invalidated_props):
-        if changed_props is None:
+        # A single PropertiesChanged may carry several properties, notify
+        # about every one of them. The daemon may send bursts of these, so
+        # we collect them and notify once per property from an idle
+        # callback.
+        pending = {self._PROP_NOTIFY[name] for name in changed_props if name in self._PROP_NOTIFY}
+        if not pending:
             return
 
-        changed_props = changed_props.unpack()
+        if self._notify_source is None:
+            self._notify_source = GLib.idle_add(self._on_notify_idle)
+        self._pending_notifies |= pending
 
-        if 'DrawingsAvailable' in changed_props:
-            self.notify('drawings-available')
-        elif 'Listening' in changed_props:
-            self.notify('listening')
-        elif 'BatteryPercent' in changed_props:
-            self.notify('battery-percent')
-        elif 'BatteryState' in changed_props:
-            self.notify('battery-state')
-        elif 'Live' in changed_props:
-            self.notify('live')
+    def _on_notify_idle(self):
+        self._notify_source = None
+        self._flush_notifies()
+        return False
+
+    def _flush_notifies(self):
+        if self._notify_source is not None:
+            GLib.source_remove(self._notify_source)
+            self._notify_source = None
+        pending = self._pending_notifies
+        self._pending_notifies = set()
+        for prop in pending:
+            self.notify(prop)
 
     def __repr__(self):
-        return f'{self.address} - {self.name}'
+        if self._repr is not None:
+            return self._repr
+
+        address, name = self.address, self.name
+        r = f'{address} - {name}'
+        # BlueZ may not know the name yet, only cache the complete string
+        if address is not None and name is not None:
+            self._repr = r
+        return r
 
     def _on_mgr_devices_updated(self, manager, pspec):
         if not self.is_registering:
             return
 
-        for d in manager.devices:
-            if d.address == self.address:
-                self.is_registering = False
-                self.manager.disconnect(self.s1)
-                del self.s1
-                logger.info(f'{self}: Registration successful')
-                self.emit('registered')
+        if manager.get(self.address) is not None:
+            self.is_registering = False
+            self.manager.disconnect(self._mgr_devices_signal)
+            self._mgr_devices_signal = None
+            logger.info('%s: Registration successful', self)
+            self.emit('registered')
 
     def start_live(self, fd):
+        def on_reply(connection, res, data):
+            try:
+                result, _ = connection.call_with_unix_fd_list_finish(res)
+            except GLib.Error as e:
+                logger.error('%s: StartLive() failed: %s', self, e.message)
+                return
+            err = result.unpack()[0]
+            if err < 0:
+                logger.error('%s: StartLive() failed: %s', self, os.strerror(-err))
+
+        # the fd is duplicated into the list, the caller may close it
+        # once we return
         fd_list = Gio.UnixFDList.new()
         fd_list.append(fd)
 
-        res, fds = self.proxy.call_with_unix_fd_list_sync('org.freedesktop.tuhi1.Device.StartLive',
-                                                          GLib.Variant('(h)', (fd,)),
-                                                          Gio.DBusCallFlags.NO_AUTO_START,
-                                                          -1,
-                                                          fd_list,
-                                                          None)
+        self._connection.call_with_unix_fd_list(self._name, self.objpath,
+                                                self.interface, 'StartLive',
+                                                GLib.Variant('(h)', (0,)),
+                                                GLib.VariantType.new('(i)'),
+                                                Gio.DBusCallFlags.NO_AUTO_START,
+                                                -1, fd_list, None, on_reply, None)
 
     def stop_live(self):
-        self.proxy.StopLive()
+        self._call('StopLive')
 
     def terminate(self):
-        try:
-            self.manager.disconnect(self.s1)
-        except AttributeError:
-            pass
+        if self._mgr_devices_signal is not None:
+            self.manager.disconnect(self._mgr_devices_signal)
+            self._mgr_devices_signal = None
+        if self._notify_source is not None:
+            GLib.source_remove(self._notify_source)
+            self._notify_source = None
+        self._pending_notifies = set()
         self._bluez_device.terminate()
         super().terminate()
 
@@ -317,11 +541,39 @@ class TuhiDBusClientManager(_DBusObject):
             (GObject.SignalFlags.RUN_FIRST, None, (GObject.TYPE_PYOBJECT,)),
     }
 
+    # DBus property name to the GObject property we notify about. 'Devices'
+    # needs extra processing and is handled separately.
+    _PROP_NOTIFY = {
+        'Searching': 'searching',
+    }
+
     def __init__(self):
         super().__init__(TUHI_DBUS_NAME, ORG_FREEDESKTOP_TUHI1_MANAGER, ROOT_PATH)
 
         self._devices = {}
+        # objpath: device for the devices in self._devices
+        self._devices_by_objpath = {}
+        # objpaths of registered devices whose proxy is being created
+        self._pending_objpaths = set()
+        # cancels those proxy creations in terminate()
+        self._cancellable = Gio.Cancellable()
+        # objpath: device, the device is None until someone needs it
         self._unregistered_devices = {}
+        # True while a search started by start_search() is running
+        self._search_requested = False
+        # caches derived from the two dicts above, None if out of date
+        self._devices_cache = None
+        self._unregistered_devices_cache = None
+        # sorted lists of the registered and unregistered devices' addresses
+        self._addr_index = None
+        self._unregistered_addr_index = None
+        # (prefix, result) of the last addr_prefix() call, readline tends
+        # to ask for the same completion several times in a row
+        self._addr_prefix_last = None
+        # objpaths of the devices known at startup whose proxies aren't
+        # ready yet, 'initialized' is set once this is empty
+        self._initial_objpaths = set()
+        self._initialized = False
         logger.info('starting up')
 
         if not self.online:
@@ -331,82 +583,216 @@ class TuhiDBusClientManager(_DBusObject):
 
     def _init(self, *args, **kwargs):
         logger.info('manager is online')
-        for objpath in self.property('Devices'):
-            device = TuhiDBusClientDevice(self, objpath)
-            self._devices[device.address] = device
+        # Creating a proxy fetches all of the object's properties. Create
+        # the device proxies asynchronously so those requests are in
+        # flight together instead of waiting for each device in turn.
+        # Devices are added (and 'devices' notified) as they are ready.
+        self._initial_objpaths = set(self.property('Devices') or [])
+        for objpath in self._initial_objpaths:
+            self._add_device_async(objpath)
+        self._check_initialized()
+
+    def _add_device_async(self, objpath):
+        if objpath in self._pending_objpaths:
+            return
+
+        self._pending_objpaths.add(objpath)
+        Gio.DBusProxy.new(self._connection, _PROXY_FLAGS, None,
+                          TUHI_DBUS_NAME, objpath,
+                          ORG_FREEDESKTOP_TUHI1_DEVICE, self._cancellable,
+                          self._on_device_proxy_ready, objpath)
+
+    def _on_device_proxy_ready(self, source, res, objpath):
+        self._pending_objpaths.discard(objpath)
+        try:
+            proxy = Gio.DBusProxy.new_finish(res)
+        except GLib.Error as e:
+            # we got terminated in the meantime
+            if e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                return
+            logger.error('%s: failed to connect to device: %s', objpath, e.message)
+            proxy = None
+
+        # we got terminated in the meantime
+        if self.proxy is None:
+            return
+
+        if proxy is not None:
+            self._add_device(TuhiDBusClientDevice(self, objpath, proxy=proxy))
+            self._devices_changed()
+            self.notify('devices')
+
+        self._initial_objpaths.discard(objpath)
+        self._check_initialized()
+
+    def _check_initialized(self):
+        if self._initialized or self._initial_objpaths:
+            return
+        self._initialized = True
+        self.notify('initialized')
+
+    def _add_device(self, device):
+        self._devices[device.address] = device
+        self._devices_by_objpath[device.objpath] = device
+
+    def _devices_changed(self):
+        self._devices_cache = None
+        self._addr_index = None
+        self._addr_prefix_last = None
+
+    def _unregistered_devices_changed(self):
+        self._unregistered_devices_cache = None
+        self._unregistered_addr_index = None
+
+    @GObject.Property
+    def initialized(self):
+        return self._initialized
 
     @GObject.Property
     def devices(self):
-        return [v for k, v in self._devices.items()]
+        if self._devices_cache is None:
+            self._devices_cache = tuple(self._devices.values())
+        return self._devices_cache
 
     @GObject.Property
     def unregistered_devices(self):
-        return [v for k, v in self._unregistered_devices.items()]
+        if self._unregistered_devices_cache is None:
+            self._unregistered_devices_cache = tuple(self._unregistered_device(objpath)
+                                                     for objpath in self._unregistered_devices)
+        return self._unregistered_devices_cache
+
+    def _unregistered_device(self, objpath):
+        device = self._unregistered_devices[objpath]
+        if device is None:
+            device = TuhiDBusClientDevice(self, objpath)
+            self._unregistered_devices[objpath] = device
+        return device
 
     @GObject.Property
     def searching(self):
-        return self.proxy.get_cached_property('Searching')
+        return self.property('Searching')
 
     def start_search(self):
         self._unregistered_devices = {}
-        self.proxy.StartSearch()
+        self._unregistered_devices_changed()
+        self._search_requested = True
+        self._call('StartSearch')
 
     def stop_search(self):
         try:
-            self.proxy.StopSearch()
+            self._call('StopSearch')
         except GLib.Error as e:
             if (e.domain != 'g-dbus-error-quark' or
                     e.code != Gio.IOErrorEnum.EXISTS or
                     Gio.dbus_error_get_remote_error(e) != 'org.freedesktop.DBus.Error.ServiceUnknown'):
                 raise e
+        self._search_requested = False
         self._unregistered_devices = {}
+        self._unregistered_devices_changed()
 
     def terminate(self):
+        self._cancellable.cancel()
+        self._pending_objpaths = set()
         for dev in self._devices.values():
             dev.terminate()
+        for dev in self._unregistered_devices.values():
+            if dev is not None:
+                dev.terminate()
         self._devices = {}
+        self._devices_by_objpath = {}
         self._unregistered_devices = {}
+        self._devices_changed()
+        self._unregistered_devices_changed()
         super().terminate()
 
     def _on_properties_changed(self, proxy, changed_props, invalidated_props):
-        if changed_props is None:
-            return
-
-        changed_props = changed_props.unpack()
-
         if 'Devices' in changed_props:
-            objpaths = changed_props['Devices']
+            objpaths = self.property('Devices')
             for objpath in objpaths:
-                try:
-                    d = self._unregistered_devices[objpath]
-                    self._devices[d.address] = d
+                # if we called Register() on an existing device it's not
+                # in unregistered devices, and there's nothing to do
+                if objpath in self._devices_by_objpath or objpath in self._pending_objpaths:
+                    continue
+
+                if objpath in self._unregistered_devices:
+                    self._add_device(self._unregistered_device(objpath))
                     del self._unregistered_devices[objpath]
-                except KeyError:
-                    # if we called Register() on an existing device it's not
-                    # in unregistered devices
-                    pass
+                else:
+                    # registered by someone else
+                    self._add_device_async(objpath)
+            self._devices_changed()
+            self._unregistered_devices_changed()
             self.notify('devices')
-        if 'Searching' in changed_props:
-            self.notify('searching')
+        for name in changed_props:
+            if name in self._PROP_NOTIFY:
+                self.notify(self._PROP_NOTIFY[name])
 
     def _handle_unregistered_device(self, objpath):
-        for addr, dev in self._devices.items():
-            if dev.objpath == objpath:
-                self.emit('unregistered-device', dev)
-                return
+        dev = self._devices_by_objpath.get(objpath)
+        if dev is not None:
+            self.emit('unregistered-device', dev)
+            return
 
-        device = TuhiDBusClientDevice(self, objpath)
-        self._unregistered_devices[objpath] = device
+        self._unregistered_devices.setdefault(objpath, None)
+        self._unregistered_devices_changed()
+
+        # Unless we're searching, nobody is waiting for this device. Don't
+        # create the proxies until it is actually used.
+        if not self._search_requested:
+            return
 
-        logger.debug(f'New unregistered device: {device}')
+        device = self._unregistered_device(objpath)
+
+        logger.debug('New unregistered device: %s', device)
         self.emit('unregistered-device', device)
 
     def _on_signal_received(self, proxy, sender, signal, parameters):
         if signal == 'SearchStopped':
+            self._search_requested = False
             self.notify('searching')
         elif signal == 'UnregisteredDevice':
             objpath = parameters[0]
             self._handle_unregistered_device(objpath)
 
+    def addr_prefix(self, prefix):
+        '''
+        Return the sorted list of addresses of the registered devices that
+        start with prefix. The returned list must not be modified.
+        '''
+        last = self._addr_prefix_last
+        if last is not None and last[0] == prefix:
+            return last[1]
+
+        if self._addr_index is None:
+            self._addr_index = sorted(self._devices)
+        result = self._prefix_range(self._addr_index, prefix)
+        self._addr_prefix_last = (prefix, result)
+        return result
+
+    def unregistered_addr_prefix(self, prefix):
+        '''
+        Return the sorted list of addresses of the unregistered devices that
+        start with prefix.
+        '''
+        if self._unregistered_addr_index is None:
+            # The daemon names the device objects after their address
+            # (/org/freedesktop/tuhi1/AA_BB_CC_DD_EE_FF), so we don't
+            # need to create the device proxies to get the addresses.
+            self._unregistered_addr_index = sorted(objpath.rsplit('/', 1)[-1].replace('_', ':')
+                                                   for objpath in self._unregistered_devices)
+        return self._prefix_range(self._unregistered_addr_index, prefix)
+
+    @staticmethod
+    def _prefix_range(index, prefix):
+        lo = bisect.bisect_left(index, prefix)
+        hi = bisect.bisect_left(index, prefix + '\xff')
+        return index[lo:hi]
+
     def __getitem__(self, btaddr):
         return self._devices[btaddr]
+
+    def get(self, btaddr, default=None):
+        '''
+        Return the registered device with the given address or default
+        '''
+        return self._devices.get(btaddr, default)
@@ -13,6 +13,7 @@
 
 import logging
 import errno
+import os
 
 from gi.repository import GObject, Gio, GLib
 from .drawing import Drawing
@@ -97,6 +98,12 @@ INTROSPECTION_XML = '''
       <arg name='json' type='s' direction='out'/>
     </method>
 
+    <method name='GetJSONDataFd'>
+      <arg name='file_version' type='u' direction='in'/>
+      <arg name='timestamp' type='t' direction='in'/>
+      <arg name='json_fd' type='h' direction='out'/>
+    </method>
+
     <signal name='ButtonPressRequired' />
 
     <signal name='ListeningStopped'>
@@ -286,6 +293,8 @@ class TuhiDBusDevice(_TuhiDBus):
         elif methodname == 'GetJSONData':
             json = GLib.Variant.new_string(self._json_data(args))
             invocation.return_value(GLib.Variant.new_tuple(json))
+        elif methodname == 'GetJSONDataFd':
+            self._json_data_fd(args, invocation)
 
     def _property_read_cb(self, connection, sender, objpath, interface, propname):
         if interface != INTF_DEVICE:
@@ -466,8 +475,29 @@ class TuhiDBusDevice(_TuhiDBus):
         else:
             return drawing.to_json()
 
-    def add_drawing(self, drawing):
-        self.drawings[drawing.timestamp] = drawing
+    def _json_data_fd(self, args, invocation):
+        # Same data as GetJSONData but written into a memfd, the client
+        # reads it from there instead of getting a huge string through
+        # the bus
+        fd = os.memfd_create('tuhi-json', os.MFD_CLOEXEC)
+        try:
+            with open(fd, 'wb', closefd=False) as f:
+                f.write(self._json_data(args).encode('utf-8'))
+            os.lseek(fd, 0, os.SEEK_SET)
+            fd_list = Gio.UnixFDList.new()
+            index = fd_list.append(fd)
+        finally:
+            os.close(fd)
+
+        result = GLib.Variant.new_handle(index)
+        invocation.return_value_with_unix_fd_list(GLib.Variant.new_tuple(result), fd_list)
+
+    def add_drawings(self, drawings):
+        '''
+        Add all drawings with a single DrawingsAvailable change
+        '''
+        for drawing in drawings:
+            self.drawings[drawing.timestamp] = drawing
         ts = GLib.Variant.new_array(GLib.VariantType('t'),
                                     [GLib.Variant.new_uint64(t)
                                         for t in self.drawings.keys()])
@@ -18,19 +18,21 @@ import logging
 logger = logging.getLogger('tuhi.drawing')
 
 
-class Point(GObject.Object):
+class Point(object):
+    # Nothing about a point needs GObject, and there may be many of them
+    __slots__ = ('stroke', 'position', 'pressure')
+
     def __init__(self, stroke):
-        GObject.Object.__init__(self)
         self.stroke = stroke
         self.position = None
         self.pressure = None
 
     def to_dict(self):
         d = {}
-        for key in ['position', 'pressure']:
-            val = getattr(self, key, None)
-            if val is not None:
-                d[key] = val
+        if self.position is not None:
+            d['position'] = self.position
+        if self.pressure is not None:
+            d['pressure'] = self.pressure
         return d
 
 
@@ -38,7 +40,11 @@ class Stroke(GObject.Object):
     def __init__(self, drawing):
         GObject.Object.__init__(self)
         self.drawing = drawing
-        self.points = []
+        # A stroke has thousands of samples, so we store them as parallel
+        # lists rather than as one Point object each. Either value may be
+        # None for a sample.
+        self._positions = []
+        self._pressures = []
         self._position = (0, 0)
         self._pressure = 0
         self._is_sealed = False
@@ -47,40 +53,76 @@ class Stroke(GObject.Object):
     def sealed(self):
         return self._is_sealed
 
+    @GObject.Property
+    def points(self):
+        '''
+        The samples as list of Point objects, created on each access
+        '''
+        points = []
+        for position, pressure in zip(self._positions, self._pressures):
+            p = Point(self)
+            p.position = position
+            p.pressure = pressure
+            points.append(p)
+        return points
+
+    def __len__(self):
+        return len(self._positions)
+
     def seal(self):
         self._is_sealed = True
 
     def new_rel(self, position=None, pressure=None):
         assert not self._is_sealed
 
-        p = Point(self)
         if position is not None:
             x, y = self._position
             self._position = (x + position[0], y + position[1])
-            p.position = self._position
+            position = self._position
         if pressure is not None:
             self._pressure += pressure
-            p.pressure = self._pressure
+            pressure = self._pressure
 
-        self.points.append(p)
+        self._positions.append(position)
+        self._pressures.append(pressure)
 
     def new_abs(self, position=None, pressure=None):
         assert not self._is_sealed
 
-        p = Point(self)
         if position is not None:
             self._position = position
-            p.position = position
         if pressure is not None:
             self._pressure = pressure
-            p.pressure = pressure
 
-        self.points.append(p)
+        self._positions.append(position)
+        self._pressures.append(pressure)
+
+    def extend_abs(self, positions, pressures):
+        '''
+        Append a sequence of absolute samples in one go. Unlike
+        new_abs(), neither position nor pressure may be None.
+        '''
+        assert not self._is_sealed
+        assert len(positions) == len(pressures)
+
+        if not positions:
+            return
+
+        self._positions.extend(positions)
+        self._pressures.extend(pressures)
+        self._position = positions[-1]
+        self._pressure = pressures[-1]
 
     def to_dict(self):
-        d = {}
-        d['points'] = [p.to_dict() for p in self.points]
-        return d
+        points = []
+        for position, pressure in zip(self._positions, self._pressures):
+            p = {}
+            if position is not None:
+                p['position'] = position
+            if pressure is not None:
+                p['pressure'] = pressure
+            points.append(p)
+        return {'points': points}
 
 
 class Drawing(GObject.Object):
@@ -98,12 +140,15 @@ class Drawing(GObject.Object):
         self.strokes = []
         self._current_stroke = -1
         self.session_id = 'unset'
+        self._is_sealed = False
+        self._json = None
 
     def seal(self):
         # Drop empty strokes
         for s in self.strokes:
             s.seal()
-        self.strokes = [s for s in self.strokes if s.points]
+        self.strokes = [s for s in self.strokes if len(s)]
+        self._is_sealed = True
 
     # The way we're building drawings, we don't need to change the current
     # stroke at runtime, so this is read-ony
@@ -127,7 +172,10 @@ class Drawing(GObject.Object):
         self._current_stroke += 1
         return s
 
-    def to_json(self):
+    def to_json(self, indent=None):
+        if indent is None and self._json is not None:
+            return self._json
+
         json_data = {
             'version': self.JSON_FILE_FORMAT_VERSION,
             'devicename': self.name,
@@ -136,7 +184,15 @@ class Drawing(GObject.Object):
             'timestamp': self.timestamp,
             'strokes': [s.to_dict() for s in self.strokes]
         }
-        return json.dumps(json_data, indent=2)
+        # The C encoder only handles the compact format, the indenting one
+        # is written in Python and several times slower. Only files meant
+        # to be read by humans ask for an indent.
+        js = json.dumps(json_data, indent=indent)
+        # A sealed drawing doesn't change anymore, but the JSON may be
+        # requested many times (every GetJSONData call)
+        if indent is None and self._is_sealed:
+            self._json = js
+        return js
 
     @classmethod
     def from_json(cls, path):
@@ -160,6 +216,7 @@ class Drawing(GObject.Object):
                         position = p.get('position', None)
                         pressure = p.get('pressure', None)
                         stroke.new_abs(position, pressure)
+                d.seal()
             except KeyError:
                 logger.error(f'{path}: failed to parse json file')
 
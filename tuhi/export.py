@@ -12,8 +12,6 @@
 #
 
 from gi.repository import GObject
-import svgwrite
-from svgwrite import mm
 import cairo
 
 
@@ -47,33 +45,36 @@ class ImageExportBase(GObject.Object):
     def output_strokes(self):
 
         width, height = self.output_dimensions
-        strokes = []
-
-        for s in self.json['strokes']:
-            points_with_sk_width = []
-
-            for p in s['points']:
-
-                x, y = p['position']
-                # Scaling coordinates
-                x = x / self._output_scaling_factor
-                y = y / self._output_scaling_factor
-
-                if self.orientation == 'reverse-portrait':
-                    x, y = y, height - x
-                elif self.orientation == 'portrait':
-                    x, y = width - y, x
-                elif self.orientation == 'reverse-landscape':
-                    x, y = width - x, height - y
+        scale = self._output_scaling_factor
+        base_width = self._base_pen_width
+        width_factor = self._pen_pressure_width_factor
+
+        # Pick the orientation transform once instead of per point
+        if self.orientation == 'reverse-portrait':
+            def transform(x, y):
+                return y / scale, height - x / scale
+        elif self.orientation == 'portrait':
+            def transform(x, y):
+                return width - y / scale, x / scale
+        elif self.orientation == 'reverse-landscape':
+            def transform(x, y):
+                return width - x / scale, height - y / scale
+        else:
+            def transform(x, y):
+                return x / scale, y / scale
 
+        def stroke_points(points):
+            for p in points:
+                x, y = transform(*p['position'])
                 # Pressure normalized range is [0, 0xffff]
                 delta = (p['pressure'] - 0x8000) / 0x8000
-                stroke_width = self._base_pen_width + self._pen_pressure_width_factor * delta
-                points_with_sk_width.append((x, y, stroke_width))
+                yield x, y, base_width + width_factor * delta
 
-            strokes.append(points_with_sk_width)
-
-        return strokes
+        # Yield one lazily converted stroke at a time so the exporters
+        # convert and write each point in a single pass, without an
+        # intermediate list per stroke
+        for s in self.json['strokes']:
+            yield stroke_points(s['points'])
 
 
 class JsonSvg(ImageExportBase):
@@ -88,41 +89,48 @@ class JsonSvg(ImageExportBase):
     def _convert(self):
 
         width, height = self.output_dimensions
-        size = width * mm, height * mm
-
-        # Make sure to set viewBox here so mm doesn't have to be specified in all later parts
-        svg = svgwrite.Drawing(filename=self.filename, size=size, viewBox=(f'0 0 {width} {height}'))
-
-        g = svgwrite.container.Group(id='layer0')
-        for sk_num, stroke_points in enumerate(self.output_strokes):
-            path = None
-            stroke_width_p = None
-            for i, (x, y, stroke_width) in enumerate(stroke_points):
-                if not x or not y:
-                    continue
-
-                # Reduce precision of the width
-                stroke_width = int(stroke_width * self._width_precision) / self._width_precision
-
-                # Create a new path per object and per unique width
-                if stroke_width_p != stroke_width:
-                    if path:
-                        g.add(path)
-                    # Reduce width by mm to px at 96dpi (see SVG/CSS specification)
-                    width_px = stroke_width * 0.26458
-                    path = svg.path(id=f'sk_{sk_num}_{i}', style=f'fill:none;stroke:black;stroke-width:{width_px}')
-                    stroke_width_p = stroke_width
-                    path.push("M", f'{x:.2f}', f'{y:.2f}')
-
-                else:
-                    # Continue writing segment line with next coords
-                    path.push("L", f'{x:.2f}', f'{y:.2f}')
-
-            if path:
-                g.add(path)
 
-        svg.add(g)
-        svg.save()
+        # The SVG we generate is trivial, so we write it out directly
+        # instead of building a DOM first.
+        with open(self.filename, 'w') as f:
+            # Set viewBox here so mm doesn't have to be specified in all later parts
+            f.write('<?xml version="1.0" encoding="utf-8" ?>\n'
+                    f'<svg baseProfile="full" height="{height}mm" version="1.1" '
+                    f'viewBox="0 0 {width} {height}" width="{width}mm" '
+                    'xmlns="http://www.w3.org/2000/svg">'
+                    '<g id="layer0">')
+
+            for sk_num, stroke_points in enumerate(self.output_strokes):
+                path = None
+                stroke_width_p = None
+                for i, (x, y, stroke_width) in enumerate(stroke_points):
+                    if not x or not y:
+                        continue
+
+                    # Reduce precision of the width
+                    stroke_width = int(stroke_width * self._width_precision) / self._width_precision
+
+                    # Create a new path per object and per unique width
+                    if stroke_width_p != stroke_width:
+                        if path:
+                            f.write(self._svg_path(*path))
+                        # Reduce width by mm to px at 96dpi (see SVG/CSS specification)
+                        width_px = stroke_width * 0.26458
+                        path = (f'sk_{sk_num}_{i}', width_px, [f'{x:.2f} {y:.2f}'])
+                        stroke_width_p = stroke_width
+                    else:
+                        # Continue writing segment line with next coords
+                        path[2].append(f'{x:.2f} {y:.2f}')
+
+                if path:
+                    f.write(self._svg_path(*path))
+
+            f.write('</g></svg>')
+
+    @staticmethod
+    def _svg_path(id, width_px, coords):
+        return (f'<path d="M {" L ".join(coords)}" id="{id}" '
+                f'style="fill:none;stroke:black;stroke-width:{width_px}" />')
 
 
 class JsonPng(ImageExportBase):
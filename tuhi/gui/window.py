@@ -140,10 +140,18 @@ class MainWindow(Gtk.ApplicationWindow):
         self.headerbar.set_title('Tuhi')
         self.stack_perspectives.set_visible_child_name(dp.name)
 
-        if not self._tuhi.devices:
+        # the registered devices are added asynchronously, don't offer the
+        # setup dialog before we know whether there are any
+        if not self._tuhi.initialized:
+            self._tuhi.connect('notify::initialized', self._on_devices_initialized, dp)
+        else:
+            self._on_devices_initialized(self._tuhi, None, dp)
+
+    def _on_devices_initialized(self, manager, pspec, dp):
+        if not manager.devices:
             self._register_device()
         else:
-            device = self._tuhi.devices[0]
+            device = manager.devices[0]
             self._init_device(device)
             dp.device = device
             self.headerbar.set_title(f'Tuhi - {dp.device.name}')
@@ -290,7 +290,8 @@ class Protocol(object):
         '''
         files = []
         while data:
-            logger.debug(f'... remaining data ({len(data)}): {list2hex(data)}')
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f'... remaining data ({len(data)}): {list2hex(data)}')
             sf = StrokeFile(data)
             files.append(sf)
             data = data[sf.bytesize:]
@@ -1485,8 +1486,9 @@ class StrokeFile(object):
         # The Spark can have a delta on the first point in a file. Let's
         # default to 0, 0, 0 because I don't know what else could be
         # sensible here.
-        last_point = Point(0, 0, 0)  # abs coords for most recent point
-        last_delta = Point(0, 0, 0)  # delta accumulates
+        # Plain ints rather than Point tuples, this runs for every sample
+        x, y, p = 0, 0, 0  # abs coords for most recent point
+        dx, dy, dp = 0, 0, 0  # delta accumulates
 
         strokes = []  # all strokes
         points = []  # Points of current strokes
@@ -1518,9 +1520,20 @@ class StrokeFile(object):
         # (bitmask 0xbf). So it's just a delta with an extra two bytes for
         # headers, so what is the point of it? Presumably a firmware bug or
         # something.
-        while data:
+        #
+        # A packet is at most 18 bytes (a StrokeHeader followed by the pen
+        # id packet), so the packet parsers only get a small window of the
+        # data. Slicing off the consumed bytes of the whole buffer for
+        # every packet made parsing quadratic in the file size.
+        buf = data
+        # The f-strings below are formatted whether or not the message is
+        # logged, which costs more than the parsing itself
+        debug = logger.isEnabledFor(logging.DEBUG)
+        while consumed < len(buf):
+            data = buf[consumed:consumed + 32]
             packet_type = StrokeDataType.identify(data)
-            logger.debug(f'Next data packet {packet_type.name}: {list2hex(data[:16])} …')
+            if debug:
+                logger.debug(f'Next data packet {packet_type.name}: {list2hex(data[:16])} …')
 
             packet = None
             if packet_type == StrokeDataType.UNKNOWN:
@@ -1542,14 +1555,13 @@ class StrokeFile(object):
                 if points:
                     strokes.append(Stroke(points))
                     points = []
-                data = data[packet.size:]
                 consumed += packet.size
                 break
             elif packet_type == StrokeDataType.STROKE_HEADER:
                 # New stroke means resetting delta and storing the last
                 # stroke
                 packet = StrokeHeader(data)
-                last_delta = Point(0, 0, 0)
+                dx, dy, dp = 0, 0, 0
                 if points:
                     strokes.append(Stroke(points))
                     points = []
@@ -1583,8 +1595,6 @@ class StrokeFile(object):
                 # P4(x) = P0 + 4*d1 + 3*d2 + 2*d3 + d4
                 # P4(y) = P0 + 4*d1 + 2*d3 ... d2 and d4 are missing (zero)
                 # P4(p) = P4(p) .... absolute
-                dx, dy, dp = last_delta
-                x, y, p = last_point
                 if packet.dx is not None:
                     dx += packet.dx
                 elif packet.x is not None:
@@ -1607,20 +1617,20 @@ class StrokeFile(object):
                 # x,y,p    ... most recent known abs coordinates
                 # add those two together and we have the real coordinates
                 # and the baseline for the next point
-                last_delta = Point(dx, dy, dp)
-                current_point = Point(x, y, p)
-                last_point = Point(current_point.x + last_delta.x,
-                                   current_point.y + last_delta.y,
-                                   current_point.p + last_delta.p)
-                logger.debug(f'Calculated point: {last_point}')
+                x += dx
+                y += dy
+                p += dp
+                last_point = Point(x, y, p)
+                if debug:
+                    logger.debug(f'Calculated point: {last_point}')
                 points.append(last_point)
             else:
                 # should never get here
                 raise StrokeParsingError('Failed to parse', data[:16])
 
-            logger.debug(f'Offset {consumed}: {packet}')
+            if debug:
+                logger.debug(f'Offset {consumed}: {packet}')
             consumed += packet.size
-            data = data[packet.size:]
 
         self.strokes = strokes
         return consumed
@@ -623,15 +623,15 @@ class WacomProtocolBase(WacomProtocolLowLevelComm):
         drawing = Drawing(self.device.name, (self.width, self.height), timestamp)
         drawing.session_id = IDGenerator.current()
         ps = self.point_size
+        pressure = self.pressure
+        NORMALIZED_RANGE = 0x10000
 
-        def normalize(p):
-            NORMALIZED_RANGE = 0x10000
-            return NORMALIZED_RANGE * p / self.pressure
-
+        # All points in a StrokeFile are absolute and complete, so we skip
+        # the per-point checks in Stroke.new_abs()
         for s in f.strokes:
             stroke = drawing.new_stroke()
-            for p in s.points:
-                stroke.new_abs((p.x * ps, p.y * ps), normalize(p.p))
+            stroke.extend_abs([(p.x * ps, p.y * ps) for p in s.points],
+                              [NORMALIZED_RANGE * p.p / pressure for p in s.points])
             stroke.seal()
         drawing.seal()
         return drawing